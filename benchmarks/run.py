@@ -0,0 +1,345 @@
+"""
+河南省暴雨洪水计算流程的性能基准测试
+
+用法（在仓库根目录下）：
+    python benchmarks/run.py                          # 运行全部基准测试，结果写入 benchmarks/results/
+    python benchmarks/run.py -k contour               # 只运行名称包含 contour 的基准测试
+    python benchmarks/run.py --compare old.json       # 与之前的结果比较，变慢超过阈值时返回非零退出码
+    python benchmarks/run.py --check                  # 只运行一致性检查（可与 -k 同时使用）
+
+运行基准测试前先进行一致性检查（批量计算与逐点计算、参考实现的结果一致），检查失败时不进行计时。
+
+如果没有 contour/transform_param.py（坐标转换参数未公开），自动使用合成的替代参数，
+结果文件中的 transform_param 字段记录为 "stand-in"。替代参数下的查询结果没有实际意义，但计算量相同。
+"""
+import os
+import sys
+import json
+import time
+import types
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+import importlib.util
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULT_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+TP_MODULE = 'cnhydropy.hydrology.stream_flood_henan.contour.transform_param'
+
+# 一致性检查使用的投影字符串（含 +towgs84 基准转换参数，替代参数中没有此类投影）
+TOWGS84_PROJ_STRING = (
+    '+proj=tmerc +lat_0=0 +lon_0=114 +k=1 +x_0=500000 +y_0=0 +ellps=krass '
+    '+towgs84=15.8,-154.4,-82.3,0,0,0,0 +units=m +no_defs')
+
+
+def import_package():
+    """导入 cnhydropy（仓库目录名不是 cnhydropy 时按路径加载）"""
+    try:
+        import cnhydropy
+        return cnhydropy
+    except ImportError:
+        spec = importlib.util.spec_from_file_location(
+            'cnhydropy', os.path.join(ROOT, '__init__.py'), submodule_search_locations=[ROOT])
+        module = importlib.util.module_from_spec(spec)
+        sys.modules['cnhydropy'] = module
+        spec.loader.exec_module(module)
+        return module
+
+
+def install_transform_param():
+    """没有坐标转换参数文件时，安装合成的替代参数（横轴墨卡托投影，平面坐标范围与图集数字化坐标相当）"""
+    path = os.path.join(ROOT, 'hydrology', 'stream_flood_henan', 'contour', 'transform_param.py')
+    if os.path.exists(path):
+        return 'real'
+
+    class Param(object):
+        proj_str = '+proj=tmerc +lon_0={0} +lat_0={1} +ellps=WGS84 +units=m'
+        transform_param = [[113.5, 33.9], 70.0, [-350000.0, -252000.0]]
+
+    tp = types.ModuleType(TP_MODULE)
+    for name in ['Area84TJ'] + ['Contour84T%s' % i for i in
+                                ['02', '03', '05', '06', '08', '09', '11', '12', '21', '22', '23']]:
+        setattr(tp, name, Param)
+    sys.modules[TP_MODULE] = tp
+    return 'stand-in'
+
+
+def timeit(func, setup=None, repeat=5, min_time=0.2):
+    """
+    计时
+    :param func: callable 被测函数
+    :param setup: callable 每次调用前执行（不计时）；指定时每轮只调用一次 func
+    :param repeat: int 重复轮数
+    :param min_time: float 未指定 setup 时，每轮调用次数使单轮耗时不少于此值（秒）
+    :return: dict 单次调用耗时（秒）的统计值
+    """
+    number = 1
+    if setup is None:
+        while True:
+            t = time.perf_counter()
+            for _ in range(number):
+                func()
+            if time.perf_counter() - t >= min_time or number >= 1 << 20:
+                break
+            number *= 2
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        t = time.perf_counter()
+        for _ in range(number):
+            func()
+        times.append((time.perf_counter() - t) / number)
+    return dict(min=min(times), median=float(np.median(times)), mean=float(np.mean(times)),
+                max=max(times), number=number, repeat=repeat)
+
+
+class Suite(object):
+    """基准测试集合"""
+
+    def __init__(self, cache_dir):
+        from cnhydropy.hydrology.stream_flood_henan import contour, stream, register
+        from cnhydropy.hydrology.stream_flood_henan.flood.reasoning_formula import ReasoningPeakFlow, FloodProcess
+        from cnhydropy.hydrology.frequency_analysis import PearsonThreeContinuousFit
+        from cnhydropy.hydraulic.hydro_element import MeasuredSection
+
+        self.contour, self.stream, self.register = contour, stream, register
+        self.ReasoningPeakFlow, self.FloodProcess = ReasoningPeakFlow, FloodProcess
+        self.PearsonThreeContinuousFit, self.MeasuredSection = PearsonThreeContinuousFit, MeasuredSection
+        self.cache_dir = cache_dir
+        contour.ContourInterface.cache_dir = cache_dir
+
+        rs = np.random.RandomState(0)
+        self.lng, self.lat = 113.0, 34.0
+        self.lngs = rs.uniform(111.0, 116.0, 10000)
+        self.lats = rs.uniform(32.0, 36.0, 10000)
+        self.floods = [(1950 + i, q) for i, q in enumerate(rs.gamma(4.0, 250.0, 60))]
+        xs = np.linspace(0, 200, 200)
+        self.section = [(x, 10.0 - 8.0 * np.sin(np.pi * x / 200.0)) for x in xs]
+
+        self.benchmarks = [
+            ('contour_cold_build', self.contour_cold_build, self.clear_contour),
+            ('contour_cold_cached', self.contour_cold_build, self.evict_contour),
+            ('contour_warm_scalar', self.contour_warm_scalar, None),
+            ('contour_warm_batch_10k', self.contour_warm_batch, None),
+            ('area_scalar', self.area_scalar, None),
+            ('area_batch_10k', self.area_batch, None),
+            ('stream_param_cube_batch_10k', self.cube_batch, None),
+            ('stream_init', self.stream_init, None),
+            ('design_stream_hill_init', self.design_stream_hill_init, None),
+            ('design_rain_type_24h', self.design_rain_type_24h, self.invalidate_design),
+            ('reasoning_peak_flow', self.reasoning_peak_flow, None),
+            ('flood_process_flood', self.flood_process_flood, None),
+            ('pearson_three_fit_all', self.pearson_three_fit_all, None),
+            ('measured_section_element', self.measured_section_element, None),
+        ]
+        self.checks = [
+            ('projection_parity', self.check_projection),
+            ('triangulation_parity', self.check_triangulation),
+        ]
+
+    def prepare(self):
+        """预热，并准备洪水计算所需的中间结果"""
+        s = self.stream.Stream(self.lng, self.lat)
+        self.design = self.stream.DesignStreamHill(s, 50, 0.01, curve_id=1)
+        self.peak = self.ReasoningPeakFlow(
+            50, 12, 0.01, self.design.design_hf_1h, self.design.n1, self.design.n2, self.design.n3,
+            self.design.mu, 1.2)
+        self.peak.peak_flow()
+        self.net_rain = self.design.hourly_net_rain()
+
+    def clear_contour(self):
+        self.evict_contour()
+        for name in os.listdir(self.cache_dir):
+            os.remove(os.path.join(self.cache_dir, name))
+
+    def evict_contour(self):
+        self.register.evict(self.contour.Contour84T02)
+
+    def contour_cold_build(self):
+        self.contour.Contour84T02()(self.lng, self.lat)
+
+    def contour_warm_scalar(self):
+        self.contour.Contour84T02()(self.lng, self.lat)
+
+    def contour_warm_batch(self):
+        self.contour.Contour84T02().lookup(self.lngs, self.lats)
+
+    def area_scalar(self):
+        self.contour.Area84TJ()(self.lng, self.lat)
+
+    def area_batch(self):
+        self.contour.Area84TJ().lookup(self.lngs, self.lats)
+
+    def cube_batch(self):
+        self.contour.StreamParamCube().lookup(self.lngs, self.lats)
+
+    def stream_init(self):
+        self.stream.Stream(self.lng, self.lat)
+
+    def design_stream_hill_init(self):
+        self.stream.DesignStreamHill(self.design.stream, 50, 0.01, curve_id=1)
+
+    def invalidate_design(self):
+        # 清除缓存的派生量，使计时包括设计暴雨时程分配的计算
+        self.design.invalidate()
+
+    def design_rain_type_24h(self):
+        self.design.design_rain_type_24h
+
+    def reasoning_peak_flow(self):
+        self.ReasoningPeakFlow(
+            50, 12, 0.01, self.design.design_hf_1h, self.design.n1, self.design.n2, self.design.n3,
+            self.design.mu, 1.2).peak_flow()
+
+    def flood_process_flood(self):
+        self.FloodProcess(0.01, self.net_rain, self.peak.qm, self.peak.tau, 50, self.design.R).flood()
+
+    def pearson_three_fit_all(self):
+        self.PearsonThreeContinuousFit(self.floods, methods='all')
+
+    def measured_section_element(self):
+        self.MeasuredSection(self.section).element(6.0)
+
+    def check_projection(self):
+        """批量投影（缓存的 Transformer）与逐点 Proj 的结果一致"""
+        from pyproj import Proj
+        from cnhydropy.hydrology.stream_flood_henan.contour.chart import get_transformer
+        lngs, lats = self.lngs[:200], self.lats[:200]
+        proj = Proj(TOWGS84_PROJ_STRING)
+        expected = np.array([proj(lng, lat) for lng, lat in zip(lngs, lats)])
+        actual = np.stack(get_transformer(TOWGS84_PROJ_STRING).transform(lngs, lats), axis=-1)
+        np.testing.assert_allclose(actual, expected, rtol=0, atol=1e-6)
+        for m in [self.contour.Contour84T02(), self.contour.Area84TJ()]:
+            expected = np.array([m.transform(lng, lat) for lng, lat in zip(lngs, lats)])
+            actual = np.stack(m.transform_array(lngs, lats), axis=-1)
+            np.testing.assert_allclose(actual, expected, rtol=0, atol=1e-9)
+
+    def check_triangulation(self, n=50000):
+        """各等值线图的三角网插值（三角形定位及线性插值，含单点查询）与 scipy.interpolate.LinearNDInterpolator 的结果一致"""
+        from scipy.interpolate import LinearNDInterpolator
+        rs = np.random.RandomState(1)
+        for _, item in self.contour.STREAM_PARAM_BANDS:
+            tri = item().triangulation
+            # 取值范围略大于散点范围，使部分点位于凸包以外
+            lo, hi = tri.points.min(axis=0), tri.points.max(axis=0)
+            pad = (hi - lo) * 0.05
+            xy = rs.uniform(lo - pad, hi + pad, (n, 2))
+            expected = LinearNDInterpolator(tri.points, tri.values)(xy)
+            actual = tri(xy[:, 0], xy[:, 1])
+            name = item.cls.__name__
+            np.testing.assert_array_equal(np.isnan(actual), np.isnan(expected), err_msg=name)
+            np.testing.assert_allclose(actual, expected, rtol=0, atol=1e-10, err_msg=name)
+            # 单点查询（逐点行走）与批量查询的结果完全一致
+            scalar = np.array([tri.value(x, y) for x, y in xy[:2000]])
+            np.testing.assert_array_equal(scalar, actual[:2000], err_msg=name)
+
+    def check(self, keyword=None):
+        """
+        一致性检查
+        :return: list 未通过的检查 [(名称, 错误信息), ...]
+        """
+        failures = []
+        for name, func in self.checks:
+            if keyword and keyword not in name:
+                continue
+            try:
+                func()
+            except AssertionError as e:
+                failures.append((name, str(e)))
+                print('%-32s FAILED\n%s' % (name, e))
+            else:
+                print('%-32s ok' % name)
+        return failures
+
+    def run(self, keyword=None, repeat=5):
+        results = {}
+        self.prepare()
+        for name, func, setup in self.benchmarks:
+            if keyword and keyword not in name:
+                continue
+            results[name] = timeit(func, setup, repeat=repeat)
+            print('%-32s %12.3f us' % (name, results[name]['median'] * 1e6))
+        return results
+
+
+def environment(transform_param):
+    try:
+        revision = subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        revision = None
+    import scipy
+    import pyproj
+    return dict(
+        time=time.strftime('%Y-%m-%dT%H:%M:%S'), revision=revision, transform_param=transform_param,
+        python=platform.python_version(), platform=platform.platform(), machine=platform.machine(),
+        numpy=np.__version__, scipy=scipy.__version__, pyproj=pyproj.__version__,
+    )
+
+
+def compare(results, baseline, threshold):
+    """
+    与基准结果比较
+    :return: list 变慢超过阈值的基准测试 [(名称, 原耗时, 现耗时, 比值), ...]
+    """
+    regressions = []
+    for name, stat in results.items():
+        old = baseline.get('results', {}).get(name)
+        if old is None:
+            continue
+        ratio = stat['median'] / old['median']
+        flag = ' <- regression' if ratio > threshold else ''
+        print('%-32s %10.3f us -> %10.3f us  x%.2f%s' % (
+            name, old['median'] * 1e6, stat['median'] * 1e6, ratio, flag))
+        if ratio > threshold:
+            regressions.append((name, old['median'], stat['median'], ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-k', dest='keyword', help='只运行名称包含此字符串的基准测试')
+    parser.add_argument('-r', '--repeat', type=int, default=5, help='重复轮数')
+    parser.add_argument('-o', '--output', help='结果文件路径（JSON），默认写入 benchmarks/results/')
+    parser.add_argument('--compare', help='用于比较的基准结果文件（JSON）')
+    parser.add_argument('--threshold', type=float, default=1.2, help='判定为性能退化的耗时比值')
+    parser.add_argument('--check', action='store_true', help='只运行一致性检查，不进行计时')
+    args = parser.parse_args(argv)
+
+    transform_param = install_transform_param()
+    import_package()
+    cache_dir = tempfile.mkdtemp(prefix='cnhydropy-bench-')
+    try:
+        suite = Suite(cache_dir)
+        failures = suite.check(args.keyword)
+        if failures or args.check:
+            return 1 if failures else 0
+        results = suite.run(args.keyword, args.repeat)
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    env = environment(transform_param)
+    output = args.output
+    if output is None:
+        os.makedirs(RESULT_DIR, exist_ok=True)
+        output = os.path.join(RESULT_DIR, '%s_%s.json' % (
+            time.strftime('%Y%m%d-%H%M%S'), env['revision'] or 'unknown'))
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(dict(environment=env, results=results), f, indent=2)
+    print('结果已保存至：%s' % output)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,90 @@
+"""
+查询结果缓存：
+    QuantizedLRUCache 以按容差取整后的经纬度坐标为键缓存查询结果，容量有限，按最近最少使用（LRU）淘汰，
+    并统计命中、未命中次数。坐标差异小于图集精度的重复查询可直接返回缓存结果。
+"""
+import threading
+from collections import OrderedDict
+
+
+class QuantizedLRUCache(object):
+    """按坐标取整的 LRU 缓存"""
+
+    def __init__(self, tolerance: float = 1e-5, maxsize: int = 4096):
+        """
+        :param tolerance: float 坐标取整容差（度），差异小于此值的坐标视为同一点
+        :param maxsize: int 最大缓存条数
+        """
+        if tolerance <= 0:
+            raise ValueError('坐标容差必须大于0')
+        if maxsize < 1:
+            raise ValueError('缓存容量必须大于0')
+        self.tolerance = float(tolerance)
+        self.maxsize = int(maxsize)
+        self.hits = 0
+        self.misses = 0
+        self.__data = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def key(self, lng: float, lat: float):
+        """坐标取整后的缓存键"""
+        return int(round(lng / self.tolerance)), int(round(lat / self.tolerance))
+
+    def get(self, lng: float, lat: float, default=None):
+        """
+        读取缓存
+        :return: 缓存值；未命中时返回 default
+        """
+        key = self.key(lng, lat)
+        with self.__lock:
+            if key in self.__data:
+                self.__data.move_to_end(key)
+                self.hits += 1
+                return self.__data[key]
+            self.misses += 1
+            return default
+
+    def put(self, lng: float, lat: float, value):
+        """写入缓存，超出容量时淘汰最久未使用的条目"""
+        key = self.key(lng, lat)
+        with self.__lock:
+            self.__data[key] = value
+            self.__data.move_to_end(key)
+            while len(self.__data) > self.maxsize:
+                self.__data.popitem(last=False)
+
+    def get_or_compute(self, lng: float, lat: float, func):
+        """
+        读取缓存，未命中时调用 func() 计算并写入缓存
+        :param func: callable 无参数的计算函数
+        """
+        missing = object()
+        value = self.get(lng, lat, missing)
+        if value is missing:
+            value = func()
+            self.put(lng, lat, value)
+        return value
+
+    def clear(self):
+        """清空缓存及统计数据"""
+        with self.__lock:
+            self.__data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        """
+        缓存统计
+        :return: dict hits 命中次数；misses 未命中次数；size 当前条数；maxsize 容量；tolerance 坐标容差
+        """
+        return dict(
+            hits=self.hits, misses=self.misses, size=len(self),
+            maxsize=self.maxsize, tolerance=self.tolerance,
+        )
+
+    def __len__(self):
+        return len(self.__data)
+
+    def __repr__(self):
+        return '<QuantizedLRUCache hits=%d misses=%d size=%d/%d tolerance=%g>' % (
+            self.hits, self.misses, len(self), self.maxsize, self.tolerance)
@@ -1 +1,2 @@
 from .chart import *
+from .plan import QueryPlan
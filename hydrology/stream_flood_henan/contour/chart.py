@@ -4,16 +4,23 @@
     Contour..T.. 等值线类，用于查等值线给定坐标处的值（使用线性插值法）
 """
 import os
+import itertools
+import threading
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 
 import numpy as np
-from scipy import interpolate
-from pyproj import Proj
+from pyproj import Proj, Transformer
+from scipy.spatial import cKDTree, Delaunay
 
-from ..topology import is_in_area
+from ..topology import PreparedPolygon
+from .. import register
 from ..register import singleton
-from ..exception import CoordNotInHeNanError, TransformParamError
-from . import geo
+from ..cache import QuantizedLRUCache
+from ..exception import CoordNotInHeNanError, CoordNotInRegionError, TransformParamError
+from . import store
+from .tin import Triangulation, checksum
+from .grid import ContourGrid
 
 try:
     from . import transform_param as tp
@@ -33,12 +40,195 @@ except ModuleNotFoundError:
 
 RESOURCE_DIR = os.path.dirname(os.path.abspath(__file__))
 
+# 等值线数据：优先以内存映射方式加载二进制数据（geo.npy），不存在时使用 geo.py
+geo = store.load_geo()
+
+# 按投影字符串缓存的 pyproj.Transformer（每个线程各自缓存，Transformer 对象不在线程间共享）
+_transformers = threading.local()
+
+
+def get_transformer(proj_string):
+    """
+    获取由经纬度坐标至指定投影坐标的 pyproj.Transformer（缓存）。
+    直接以投影字符串作为转换管道，与 Proj(proj_string) 的结果一致
+    （投影字符串含 +towgs84 等基准转换参数时，Transformer.from_crs 会另行进行基准转换，结果与 Proj 不一致）
+    :param proj_string: str proj 投影字符串（已填入投影参数）
+    :return: pyproj.Transformer
+    """
+    cache = getattr(_transformers, 'cache', None)
+    if cache is None:
+        cache = _transformers.cache = {}
+    transformer = cache.get(proj_string)
+    if transformer is None:
+        transformer = cache[proj_string] = Transformer.from_pipeline(Proj(proj_string).srs)
+    return transformer
+
+
+def project_to_maps(maps, lngs, lats):
+    """
+    批量将经纬度坐标转换至多幅图的平面坐标：投影字符串相同的图幅只进行一次投影计算，
+    再分别进行各自的缩放、平移（仿射变换）
+    :param maps: list TransformerInterface 实例
+    :param lngs: array_like 经度
+    :param lats: array_like 纬度
+    :return: list [(x, y), ...] 与 maps 一一对应的平面坐标数组
+    """
+    lngs, lats = np.broadcast_arrays(np.asarray(lngs, dtype=float), np.asarray(lats, dtype=float))
+    projected = {}
+    result = []
+    for m in maps:
+        if m.proj_string not in projected:
+            projected[m.proj_string] = m.project(lngs, lats)
+        result.append(m.affine(*projected[m.proj_string]))
+    return result
+
+
+def to_planar(maps, lngs, lats):
+    """
+    批量将经纬度坐标转换至各图幅的平面坐标，可保存转换结果（如 numpy.savez(path, **result)），
+    之后使用各类的 lookup_planar 直接查询，无需再次进行投影计算
+    :param maps: list TransformerInterface 实例
+    :param lngs: array_like 经度
+    :param lats: array_like 纬度
+    :return: dict {图幅类名（如 Contour84T02）: numpy.ndarray shape=(..., 2) 平面坐标}
+    """
+    return {
+        type(m).__name__: np.stack([x, y], axis=-1)
+        for m, (x, y) in zip(maps, project_to_maps(maps, lngs, lats))
+    }
+
+
+def _build_triangulation(name):
+    """进程池任务：构建（或从缓存文件加载）指定等值线图的三角网"""
+    cls = globals()[name].cls
+    return cls.get_interpolation(cls.geo_data)
+
+
+def warm_up(max_workers=None, processes=False):
+    """
+    并行预先创建水文分区图、全部暴雨参数等值线图及 StreamParamCube 单例
+    :param max_workers: int 线程（进程）数，为 None 时使用 CPU 核数
+    :param processes: bool 为 True 时在进程池中构建各等值线图的三角网（不受 GIL 限制，适用于无缓存文件的冷启动），
+                      再在本进程中创建实例并登记为单例；为 False 时使用线程池
+    :return: StreamParamCube
+    """
+    items = [Area84TJ] + [cls for _, cls in STREAM_PARAM_BANDS]
+    max_workers = max_workers or os.cpu_count() or 1
+    if not processes:
+        register.warm_up(*items, max_workers=max_workers)
+        return StreamParamCube()
+    pending = [cls for cls in items[1:] if not register.is_loaded(cls)]
+    with ProcessPoolExecutor(max_workers) as executor:
+        triangulations = executor.map(_build_triangulation, [item.cls.__name__ for item in pending])
+        # 等待子进程期间在本进程中创建水文分区图
+        Area84TJ()
+        for item, tri in zip(pending, triangulations):
+            register.install(item, item.cls(triangulation=tri))
+    return StreamParamCube()
+
+
+def load_region(item, bbox, margin=0.1):
+    """
+    创建仅包含指定区域数据的图幅实例（不是单例，不影响全图单例），
+    只读取、构建区域（含安全边距）内的等值线散点或水文分区，三角网构建耗时及内存占用与区域大小相关。
+    查询区域以外的坐标时抛出 CoordNotInRegionError。
+    :param item: 单例包装函数或类，如 contour.Contour84T02、contour.Area84TJ、contour.StreamParamCube
+    :param bbox: (min_lng, min_lat, max_lng, max_lat) 区域经纬度范围
+    :param margin: float 安全边距（度），区域边缘的插值需要区域以外的散点
+    :return: 图幅实例
+    """
+    return getattr(item, 'cls', item)(bbox=bbox, margin=margin)
+
+
+def read_csv_points(path, chunk_size=65536, lng='lng', lat='lat', **kwargs):
+    """
+    分块读取 csv 文件中的坐标（不一次读入整个文件）
+    :param path: str csv 文件路径
+    :param chunk_size: int 每块的行数
+    :param lng: str or int 经度列名（或列序号）
+    :param lat: str or int 纬度列名（或列序号）
+    :param kwargs: 传递给 pandas.read_csv 的其他参数，如 encoding、sep
+    :return: generator (lngs, lats)
+    """
+    import pandas as pd
+    usecols = [lng, lat]
+    for df in pd.read_csv(path, usecols=usecols, chunksize=chunk_size, **kwargs):
+        yield df[lng].to_numpy(dtype=float), df[lat].to_numpy(dtype=float)
+
+
+def read_npy_points(path, chunk_size=65536):
+    """
+    分块读取 .npy 文件中的坐标（内存映射，不一次读入整个文件）
+    :param path: str .npy 文件路径，数据形状为 (n, 2)，每行为 [经度, 纬度]
+    :param chunk_size: int 每块的行数
+    :return: generator (lngs, lats)
+    """
+    return iter_chunks(np.load(path, mmap_mode='r'), chunk_size)
+
+
+def iter_chunks(points, chunk_size=65536, **kwargs):
+    """
+    将坐标来源按固定大小分块
+    :param points: 坐标来源，可以是：
+                    str -> .csv 或 .npy 文件路径（见 read_csv_points、read_npy_points）；
+                    numpy.ndarray -> 形状为 (n, 2) 的数组（含内存映射数组），每行为 [经度, 纬度]；
+                    iterable -> 逐点产生 (经度, 纬度) 的可迭代对象（如生成器），
+                                或逐块产生 (经度数组, 纬度数组) 的可迭代对象（如 read_csv_points 的返回值，按原样分块）
+    :param chunk_size: int 每块的点数
+    :param kwargs: 读取 csv 文件时传递给 read_csv_points 的参数，如 lng、lat（列名）及 encoding、sep
+    :return: generator (lngs, lats) 每块的经度、纬度数组
+    """
+    if chunk_size < 1:
+        raise ValueError('chunk_size 必须大于0')
+    if isinstance(points, str):
+        if points.lower().endswith('.npy'):
+            yield from read_npy_points(points, chunk_size)
+        else:
+            yield from read_csv_points(points, chunk_size, **kwargs)
+    elif isinstance(points, np.ndarray):
+        for i in range(0, len(points), chunk_size):
+            chunk = np.asarray(points[i:i + chunk_size], dtype=float)
+            yield chunk[:, 0], chunk[:, 1]
+    else:
+        points = iter(points)
+        first = next(points, None)
+        if first is None:
+            return
+        points = itertools.chain([first], points)
+        if np.ndim(first[0]) > 0:
+            # 已分块的坐标
+            for lngs, lats in points:
+                yield np.asarray(lngs, dtype=float), np.asarray(lats, dtype=float)
+            return
+        while True:
+            chunk = np.array(list(itertools.islice(points, chunk_size)), dtype=float)
+            if not len(chunk):
+                break
+            yield chunk[:, 0], chunk[:, 1]
+
+
+class ChunkedLookup(object):
+    """分块批量查询接口，子类须实现 lookup(lngs, lats)"""
+
+    def iter_lookup(self, points, chunk_size=65536, **kwargs):
+        """
+        分块查询：逐块读取坐标，批量查询后逐块返回结果，内存占用与总点数无关
+        :param points: 坐标来源，见 iter_chunks
+        :param chunk_size: int 每块的点数
+        :param kwargs: 读取 csv 文件的参数，见 iter_chunks，如 lng='x', lat='y'
+        :return: generator 每块的查询结果（同 lookup 的返回值）
+        """
+        for lngs, lats in iter_chunks(points, chunk_size, **kwargs):
+            yield self.lookup(lngs, lats)
 
-class TransformerInterface(object):
+
+class TransformerInterface(ChunkedLookup):
     """将经纬度坐标转换为配准的平面坐标，转换器接口"""
     proj_str = None
     transform_param = None
     graph_name = None
+    cache = None  # 单点查询结果缓存（QuantizedLRUCache），为 None 时不缓存
+    region = None  # 已加载区域的平面坐标范围 (x_min, y_min, x_max, y_max)，为 None 时为全图
 
     def __init__(self, proj_str=None, transform_param=None):
         # 必须实现此接口，并设置正确的转换参数
@@ -52,10 +242,49 @@ class TransformerInterface(object):
             self.k = self.transform_param[1]
             # 位置参数（x、y方向平移量）
             self.dxy = np.array(self.transform_param[2])
-            self.proj = Proj(self.proj_str.format(*self.proj_param))
+            self.proj_string = self.proj_str.format(*self.proj_param)
+            self.proj = Proj(self.proj_string)
         except TypeError or IndexError:
             raise TransformParamError('转换参数有误！')
 
+    def region_bounds(self, bbox, margin=0.0, n=32):
+        """
+        计算经纬度范围在平面坐标中的外包矩形（沿边界加密取点后转换）
+        :param bbox: (min_lng, min_lat, max_lng, max_lat) 经纬度范围
+        :param margin: float 向外扩展的边距（度）
+        :param n: int 每条边上的取点数
+        :return: numpy.ndarray [x_min, y_min, x_max, y_max]
+        """
+        min_lng, min_lat, max_lng, max_lat = bbox
+        if min_lng >= max_lng or min_lat >= max_lat:
+            raise ValueError('区域范围有误：%s' % (bbox,))
+        lngs = np.linspace(min_lng - margin, max_lng + margin, n)
+        lats = np.linspace(min_lat - margin, max_lat + margin, n)
+        edge_lngs = np.concatenate([lngs, lngs, np.full(n, lngs[0]), np.full(n, lngs[-1])])
+        edge_lats = np.concatenate([np.full(n, lats[0]), np.full(n, lats[-1]), lats, lats])
+        x, y = self.transform_array(edge_lngs, edge_lats)
+        return np.array([x.min(), y.min(), x.max(), y.max()])
+
+    def set_region(self, bbox, margin=0.1):
+        """
+        设置查询区域
+        :param bbox: (min_lng, min_lat, max_lng, max_lat) 区域经纬度范围
+        :param margin: float 加载数据时使用的安全边距（度）
+        :return: numpy.ndarray 含安全边距的平面坐标范围 [x_min, y_min, x_max, y_max]，用于筛选数据
+        """
+        self.region = self.region_bounds(bbox)
+        return self.region_bounds(bbox, margin)
+
+    def check_region(self, x, y):
+        """检查平面坐标是否位于已加载的区域内，不在区域内时抛出 CoordNotInRegionError"""
+        if self.region is None:
+            return
+        x_min, y_min, x_max, y_max = self.region
+        outside = ~((x >= x_min) & (x <= x_max) & (y >= y_min) & (y <= y_max))
+        if np.any(outside):
+            raise CoordNotInRegionError(
+                '%d 个坐标点不在已加载的区域内（%s）！' % (np.count_nonzero(outside), type(self).__name__))
+
     def transform(self, lng: float, lat: float):
         """
         将经纬度坐标转换为配准的平面坐标
@@ -66,6 +295,81 @@ class TransformerInterface(object):
         coord = np.array(self.proj(lng, lat))
         return (coord - self.dxy) / self.k
 
+    def transform_array(self, lngs, lats):
+        """
+        批量将经纬度坐标转换为配准的平面坐标（一次 Proj 调用）
+        :param lngs: array_like 经度
+        :param lats: array_like 纬度
+        :return: tuple (x, y) 平面坐标数组，形状与输入一致
+        """
+        return self.affine(*self.project(lngs, lats))
+
+    def project(self, lngs, lats):
+        """
+        批量投影计算（使用缓存的 pyproj.Transformer），未进行缩放、平移
+        :param lngs: array_like 经度
+        :param lats: array_like 纬度
+        :return: tuple (x, y) 投影坐标数组
+        """
+        lngs, lats = np.broadcast_arrays(
+            np.asarray(lngs, dtype=float), np.asarray(lats, dtype=float))
+        x, y = get_transformer(self.proj_string).transform(lngs, lats)
+        return np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+
+    def affine(self, x, y):
+        """
+        由投影坐标计算配准的平面坐标（缩放、平移）
+        :param x: numpy.ndarray 投影坐标x轴
+        :param y: numpy.ndarray 投影坐标y轴
+        :return: tuple (x, y) 平面坐标数组
+        """
+        return (x - self.dxy[0]) / self.k, (y - self.dxy[1]) / self.k
+
+    def planar(self, x, y=None, projected=False):
+        """
+        整理输入的平面坐标
+        :param x: array_like 平面坐标x轴；y 为 None 时为 shape=(..., 2) 的坐标数组
+        :param y: array_like 平面坐标y轴
+        :param projected: bool 输入坐标为投影坐标（proj_string 所定义坐标系，未进行缩放、平移）时为 True
+        :return: tuple (x, y) 配准的平面坐标数组
+        """
+        if y is None:
+            xy = np.asarray(x, dtype=float)
+            x, y = xy[..., 0], xy[..., 1]
+        x, y = np.broadcast_arrays(np.asarray(x, dtype=float), np.asarray(y, dtype=float))
+        if projected:
+            x, y = self.affine(x, y)
+        return x, y
+
+    def lookup_planar(self, x, y=None, projected=False):
+        """
+        直接以平面坐标批量查询（不进行经纬度坐标转换）
+        :param x: array_like 平面坐标x轴；y 为 None 时为 shape=(..., 2) 的坐标数组（如 to_planar 的结果）
+        :param y: array_like 平面坐标y轴
+        :param projected: bool 输入坐标为投影坐标（未进行缩放、平移）时为 True
+        """
+        raise NotImplementedError('未实现接口：%s' % self.__class__)
+
+    def enable_cache(self, tolerance: float = 1e-5, maxsize: int = 4096):
+        """
+        启用单点查询结果缓存
+        :param tolerance: float 坐标取整容差（度）
+        :param maxsize: int 最大缓存条数
+        :return: QuantizedLRUCache
+        """
+        self.cache = QuantizedLRUCache(tolerance, maxsize)
+        return self.cache
+
+    def disable_cache(self):
+        """停用单点查询结果缓存"""
+        self.cache = None
+
+    def cached(self, lng: float, lat: float, func):
+        """已启用缓存时优先读取缓存，否则调用 func() 计算"""
+        if self.cache is None:
+            return func()
+        return self.cache.get_or_compute(lng, lat, func)
+
     def __call__(self, *args, **kwargs):
         return self.transform(*args, **kwargs)
 
@@ -73,26 +377,290 @@ class TransformerInterface(object):
 class ContourInterface(TransformerInterface):
     """等值线接口"""
     geo_data = None
+    cache_dir = RESOURCE_DIR  # 三角网、栅格缓存文件目录，为 None 时不使用缓存
+    grid_cell_size = 20.0  # 栅格插值引擎默认网格间距（平面坐标单位）
+    fallback = None  # 三角网以外的点的取值方法：None 不处理（nan）；'nearest' 最近点；'idw' 反距离加权
 
-    def __init__(self):
+    def __init__(self, bbox=None, margin=0.1, triangulation=None):
+        """
+        :param bbox: (min_lng, min_lat, max_lng, max_lat) 仅加载指定区域的数据，为 None 时加载全图，见 load_region
+        :param margin: float 区域安全边距（度）
+        :param triangulation: Triangulation 已构建的全图三角网（如在其他进程中构建的），为 None 时读取数据构建
+        """
         # 必须实现此接口，并设置正确的转换参数及数据类
         if self.geo_data is None:
             raise NotImplementedError('未实现接口：%s；或实现接口时未设置必要参数' % self.__class__)
-        self.contour_interpolation = self.get_interpolation(self.geo_data)
         super(ContourInterface, self).__init__()
+        if triangulation is not None:
+            self.triangulation = triangulation
+        elif bbox is None:
+            self.triangulation = self.get_interpolation(self.geo_data)
+        else:
+            bounds = self.set_region(bbox, margin)
+            # 区域三角网不写入缓存文件（缓存文件为全图三角网）
+            self.cache_dir = None
+            self.triangulation = self.get_region_interpolation(self.geo_data, self.region, bounds)
+        self.contour_interpolation = self.triangulation
+        self.grid = None
+        self.kdtree = None
+        self.fallback_k = 8
+        self.fallback_power = 2.0
+        self.fallback_distance = np.inf
 
     @classmethod
     def get_interpolation(cls, geo_data, **kwargs):
-        """读等值线数据文件，并返回插值对象"""
+        """读等值线数据文件，并返回插值对象（优先加载缓存的三角网）"""
         x = geo_data.x
         y = geo_data.y
         z = geo_data.z
-        return interpolate.LinearNDInterpolator(np.array([x, y]).T, z)
+        path = None
+        if cls.cache_dir is not None:
+            path = os.path.join(cls.cache_dir, '%s.tri.npz' % geo_data.__name__)
+        return Triangulation.load_or_build(np.array([x, y]).T, z, path)
+
+    @classmethod
+    def get_region_interpolation(cls, geo_data, region, bounds):
+        """
+        仅使用区域附近的散点构建三角网，区域内的插值结果与全图三角网一致。
+        先读取 bounds 范围内的散点，区域不在其凸包内时将读取范围扩大一倍；
+        再检查与区域相交的各三角形的外接圆：未读取的散点均不在外接圆内时，这些三角形也是全图三角网的三角形
+        （Delaunay 空圆性质），否则加入位于外接圆内的散点后重新构建，直至满足条件。
+        检查时只运行 Qhull（scipy.spatial.Delaunay），满足条件后才建立 Triangulation。
+        :param geo_data: 等值线数据类
+        :param region: [x_min, y_min, x_max, y_max] 查询区域（平面坐标）
+        :param bounds: [x_min, y_min, x_max, y_max] 初始读取范围（平面坐标），须包含 region
+        :return: Triangulation
+        """
+        x = np.asarray(geo_data.x, dtype=float)
+        y = np.asarray(geo_data.y, dtype=float)
+        z = np.asarray(geo_data.z, dtype=float)
+        region = np.asarray(region, dtype=float)
+        bounds = np.asarray(bounds, dtype=float)
+        keep = (x >= bounds[0]) & (x <= bounds[2]) & (y >= bounds[1]) & (y <= bounds[3])
+        while not keep.all():
+            tri = Delaunay(np.array([x[keep], y[keep]]).T) if np.count_nonzero(keep) >= 3 else None
+            circles = None if tri is None else cls.__region_circles(tri, region)
+            if circles is None:
+                # 区域不在已读取散点的凸包内：读取范围向外扩大一倍
+                pad = np.maximum(np.abs(bounds - region), 1.0) * [-1, -1, 1, 1]
+                bounds = region + 2 * pad
+                keep |= (x >= bounds[0]) & (x <= bounds[2]) & (y >= bounds[1]) & (y <= bounds[3])
+                continue
+            outside = np.flatnonzero(~keep)
+            inside = cls.__in_circles(x[outside], y[outside], circles)
+            if not inside.any():
+                return Triangulation(tri.points, tri.simplices, tri.neighbors, z[keep])
+            # 散点稀疏时外接圆很大，每次只加入读取范围扩大一倍后的范围内的散点（加入散点后外接圆通常缩小），
+            # 范围内没有此类散点时再扩大范围
+            add = outside[inside]
+            while True:
+                pad = np.maximum(np.abs(bounds - region), 1.0) * [-1, -1, 1, 1]
+                bounds = region + 2 * pad
+                near = (x[add] >= bounds[0]) & (x[add] <= bounds[2]) & (y[add] >= bounds[1]) & (y[add] <= bounds[3])
+                if near.any():
+                    keep[add[near]] = True
+                    break
+        return Triangulation.from_points(np.array([x, y]).T, z)
+
+    @staticmethod
+    def __region_circles(tri, region):
+        """
+        与区域相交的三角形的外接圆
+        :param tri: scipy.spatial.Delaunay
+        :return: tuple (cx, cy, r) 圆心及半径数组；区域不在三角网内时返回 None
+        """
+        p = tri.points[tri.simplices]
+        # 区域四角均位于凸包边界各边的内侧（与边所在三角形的第三个顶点同侧）时区域位于凸包内
+        s, k = np.nonzero(tri.neighbors < 0)
+        a, b, c = p[s, (k + 1) % 3], p[s, (k + 2) % 3], p[s, k]
+        corners = np.array([region[[0, 1]], region[[2, 1]], region[[0, 3]], region[[2, 3]]])
+        ab = b - a
+        side = ab[:, 0] * (c[:, 1] - a[:, 1]) - ab[:, 1] * (c[:, 0] - a[:, 0])
+        cross = (ab[:, None, 0] * (corners[None, :, 1] - a[:, None, 1]) -
+                 ab[:, None, 1] * (corners[None, :, 0] - a[:, None, 0]))
+        if np.any(cross * side[:, None] < 0):
+            return None
+        lo, hi = p.min(axis=1), p.max(axis=1)
+        near = (hi[:, 0] >= region[0]) & (lo[:, 0] <= region[2]) & (hi[:, 1] >= region[1]) & (lo[:, 1] <= region[3])
+        a, b, c = p[near, 0], p[near, 1], p[near, 2]
+        # 外接圆圆心（以 a 为原点）及半径；退化三角形（三点共线）的半径为无穷大
+        b, c = b - a, c - a
+        d = 2.0 * (b[:, 0] * c[:, 1] - b[:, 1] * c[:, 0])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            bb, cc = (b ** 2).sum(axis=1), (c ** 2).sum(axis=1)
+            ux = (c[:, 1] * bb - b[:, 1] * cc) / d
+            uy = (b[:, 0] * cc - c[:, 0] * bb) / d
+        r = np.hypot(ux, uy)
+        r[~np.isfinite(r)] = np.inf
+        return a[:, 0] + ux, a[:, 1] + uy, r
+
+    @staticmethod
+    def __in_circles(x, y, circles):
+        """
+        各点是否位于任一圆内（含圆周附近，共圆的散点也视为位于圆内）
+        :return: numpy.ndarray bool
+        """
+        cx, cy, r = circles
+        result = np.zeros(len(x), dtype=bool)
+        if np.isinf(r).any():
+            result[:] = True
+        elif len(x):
+            found = cKDTree(np.stack([x, y], axis=-1)).query_ball_point(np.stack([cx, cy], axis=-1), r * (1 + 1e-9))
+            result[list(itertools.chain.from_iterable(found))] = True
+        return result
+
+    def get_grid(self, cell_size=None):
+        """
+        获取栅格化的等值线（优先加载缓存）
+        :param cell_size: float 网格间距（平面坐标单位），默认为 grid_cell_size
+        :return: ContourGrid
+        """
+        cell_size = float(self.grid_cell_size if cell_size is None else cell_size)
+        tri = self.triangulation
+        key = '%s-%r' % (checksum(tri.points, tri.values), cell_size)
+        path = None
+        if self.cache_dir is not None:
+            path = os.path.join(self.cache_dir, '%s.grid%g.npy' % (self.geo_data.__name__, cell_size))
+            grid = ContourGrid.load(path, key, exact=tri) if os.path.exists(path) else None
+            if grid is not None:
+                return grid
+        grid = ContourGrid.from_triangulation(tri, cell_size)
+        if path is not None:
+            try:
+                grid.save(path, key)
+            except OSError:
+                pass
+        return grid
+
+    def use_grid(self, cell_size=None):
+        """
+        切换为栅格双线性插值引擎（近似计算，查询耗时与数据量无关）
+        :param cell_size: float 网格间距（平面坐标单位），默认为 grid_cell_size
+        :return: float 与精确三角网插值相比的最大偏差
+        """
+        self.grid = self.get_grid(cell_size)
+        self.contour_interpolation = self.grid
+        if self.cache is not None:
+            self.cache.clear()
+        return self.grid.max_error
+
+    def use_tin(self):
+        """切换为三角网线性插值引擎（精确计算，默认）"""
+        self.contour_interpolation = self.triangulation
+        if self.cache is not None:
+            self.cache.clear()
+
+    def use_fallback(self, mode='nearest', k=8, power=2.0, max_distance=np.inf):
+        """
+        设置三角网（散点凸包）以外的点的取值方法，由等值线散点构建的 cKDTree 查询邻近散点
+        :param mode: str 'nearest' 取最近散点的值；'idw' 取 k 个最近散点的反距离加权平均值；None 不处理（nan）
+        :param k: int 反距离加权使用的散点个数
+        :param power: float 反距离加权的幂次
+        :param max_distance: float 最大搜索距离（平面坐标单位），超出此距离的点仍为 nan
+        """
+        if mode not in (None, 'nearest', 'idw'):
+            raise ValueError('mode 须为 None、nearest 或 idw')
+        self.fallback = mode
+        self.fallback_k = int(k)
+        self.fallback_power = float(power)
+        self.fallback_distance = float(max_distance)
+        if mode is not None and self.kdtree is None:
+            self.kdtree = cKDTree(self.triangulation.points)
+        if self.cache is not None:
+            self.cache.clear()
+
+    def neighbor_weights(self, x, y):
+        """
+        按 fallback 设置计算指定点（平面坐标）处参与取值的邻近散点及其权重
+        :param x: numpy.ndarray 平面坐标x轴
+        :param y: numpy.ndarray 平面坐标y轴
+        :return: tuple (indices, weights) shape=(..., k) 散点索引及权重（和为1），超出最大搜索距离的点权重为 nan
+        """
+        k = 1 if self.fallback == 'nearest' else self.fallback_k
+        d, i = self.kdtree.query(
+            np.stack([x, y], axis=-1), k=k, distance_upper_bound=self.fallback_distance)
+        if k == 1:
+            d, i = d[..., None], i[..., None]
+        found = np.isfinite(d)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            w = np.where(found, 1.0 / d ** self.fallback_power, 0.0)
+            w = w / np.sum(w, axis=-1, keepdims=True)
+        # 与散点重合的点直接取该散点的值
+        exact = d[..., 0] == 0
+        w[exact] = 0.0
+        w[exact, 0] = 1.0
+        w[~found[..., 0]] = np.nan
+        return np.where(found, i, 0), w
+
+    def nearest(self, x, y):
+        """
+        按 fallback 设置由邻近散点计算指定点（平面坐标）处的值
+        :param x: numpy.ndarray 平面坐标x轴
+        :param y: numpy.ndarray 平面坐标y轴
+        :return: numpy.ndarray float 超出最大搜索距离的点为 nan
+        """
+        i, w = self.neighbor_weights(x, y)
+        return np.einsum('...j,...j->...', self.triangulation.values[i], w)
+
+    def interpolate(self, x, y):
+        """
+        对平面坐标进行插值，三角网以外的点按 fallback 设置取值
+        :param x: array_like 平面坐标x轴
+        :param y: array_like 平面坐标y轴
+        :return: tuple (values, mask) values 各点处的值；mask bool 数组，为 True 的点使用了邻近散点取值
+        """
+        x, y = np.broadcast_arrays(np.asarray(x, dtype=float), np.asarray(y, dtype=float))
+        self.check_region(x, y)
+        values = np.array(self.contour_interpolation(x, y), dtype=float)
+        mask = np.zeros(values.shape, dtype=bool)
+        if self.fallback is not None:
+            missing = np.isnan(values)
+            if missing.any():
+                values[missing] = self.nearest(x[missing], y[missing])
+                mask[missing] = ~np.isnan(values[missing])
+        return values, mask
+
+    def value(self, x: float, y: float):
+        """
+        对单个平面坐标进行插值（不经过批量计算），三角网以外的点按 fallback 设置取值
+        :param x: float 平面坐标x轴
+        :param y: float 平面坐标y轴
+        :return: float
+        """
+        x, y = float(x), float(y)
+        self.check_region(x, y)
+        value = self.contour_interpolation.value(x, y)
+        if np.isnan(value) and self.fallback is not None:
+            value = float(self.nearest(np.array([x]), np.array([y]))[0])
+        return value
 
     def __call__(self, lng: float, lat: float):
         """对等值线图进行插值，获取指定坐标（经纬度坐标）处的值"""
-        coord = super(ContourInterface, self).__call__(lng, lat)
-        return float(self.contour_interpolation(*coord))
+        return self.cached(lng, lat, lambda: self.value(*self.transform(lng, lat)))
+
+    def lookup(self, lngs, lats, return_mask=False):
+        """
+        批量查等值线图（一次坐标转换、一次插值）
+        :param lngs: array_like 经度
+        :param lats: array_like 纬度
+        :param return_mask: bool 是否同时返回使用了邻近散点取值的点
+        :return: numpy.ndarray float 各点处的值，超出图幅范围（且未设置 fallback）的点为 nan；
+                 return_mask 为 True 时返回 (values, mask)
+        """
+        values, mask = self.interpolate(*self.transform_array(lngs, lats))
+        return (values, mask) if return_mask else values
+
+    def lookup_planar(self, x, y=None, projected=False, return_mask=False):
+        """
+        直接以平面坐标批量查等值线图（不进行经纬度坐标转换）
+        :param x: array_like 平面坐标x轴；y 为 None 时为 shape=(..., 2) 的坐标数组（如 to_planar 的结果）
+        :param y: array_like 平面坐标y轴
+        :param projected: bool 输入坐标为投影坐标（未进行缩放、平移）时为 True
+        :param return_mask: bool 是否同时返回使用了邻近散点取值的点
+        :return: numpy.ndarray float 各点处的值；return_mask 为 True 时返回 (values, mask)
+        """
+        values, mask = self.interpolate(*self.planar(x, y, projected))
+        return (values, mask) if return_mask else values
 
 
 class Area84TJBase(TransformerInterface):
@@ -102,12 +670,23 @@ class Area84TJBase(TransformerInterface):
     transform_param = tp.Area84TJ.transform_param
     geo_data = geo.HN84T01
 
-    def __init__(self):
+    def __init__(self, bbox=None, margin=0.1):
+        """
+        :param bbox: (min_lng, min_lat, max_lng, max_lat) 仅加载与指定区域相交的水文分区，为 None 时加载全图，见 load_region
+        :param margin: float 区域安全边距（度）
+        """
         # 必须实现此接口，并设置正确的转换参数
         if self.geo_data is None:
             raise NotImplementedError('未实现接口：%s；或实现接口时未设置必要参数' % self.__class__)
-        self.area_info = self.get_area_info(self.geo_data)
         super().__init__()
+        self.area_info = self.get_area_info(self.geo_data)
+        if bbox is not None:
+            x_min, y_min, x_max, y_max = self.set_region(bbox, margin)
+            for area, points in list(self.area_info.items()):
+                p = np.asarray(points)
+                if p[:, 0].max() < x_min or p[:, 0].min() > x_max or p[:, 1].max() < y_min or p[:, 1].min() > y_max:
+                    del self.area_info[area]
+        self.polygons = {area: PreparedPolygon(points) for area, points in self.area_info.items()}
 
     @classmethod
     def get_area_info(cls, geo_data, **kwargs):
@@ -126,12 +705,21 @@ class Area84TJBase(TransformerInterface):
         获取指定坐标点（平面坐标）所在的水文分区
         :param x: 平面坐标x轴
         :param y: 平面坐标y轴
+        :return: int 所在分区。当输入坐标点不在河南省境内，抛出 CoordNotInHeNanError
+        """
+        area = self.find_area(x, y)
+        if area < 0:
+            raise CoordNotInHeNanError('输入的坐标不在河南省内！')
+        return area
+
+    def find_area(self, x, y):
+        """
+        获取指定坐标点（平面坐标）所在的水文分区，不抛出异常
+        :param x: 平面坐标x轴
+        :param y: 平面坐标y轴
         :return: int 所在分区。当输入坐标点不在河南省境内，返回 -1
         """
-        for i in self.area_info.keys():
-            if is_in_area([x, y], self.area_info[i]):
-                return i
-        raise CoordNotInHeNanError('输入的坐标不在河南省内！')
+        return int(self.lookup_planar(x, y))
 
     def __call__(self, lng: float, lat: float):
         """
@@ -140,8 +728,35 @@ class Area84TJBase(TransformerInterface):
         :param lat: 纬度
         :return: int 所在分区。当输入坐标点不在河南省境内，返回 -1
         """
-        coord = self.transform(lng, lat)
-        return self.get_area(*coord)
+        return self.cached(lng, lat, lambda: self.get_area(*self.transform(lng, lat)))
+
+    def lookup(self, lngs, lats):
+        """
+        批量获取坐标点（经纬度坐标）所在水文分区（一次坐标转换）
+        :param lngs: array_like 经度
+        :param lats: array_like 纬度
+        :return: numpy.ndarray int 各点所在分区，不在河南省境内的点为 -1
+        """
+        return self.lookup_planar(*self.transform_array(lngs, lats))
+
+    def lookup_planar(self, x, y=None, projected=False):
+        """
+        批量获取坐标点（平面坐标）所在水文分区
+        :param x: array_like 平面坐标x轴；y 为 None 时为 shape=(..., 2) 的坐标数组（如 to_planar 的结果）
+        :param y: array_like 平面坐标y轴
+        :param projected: bool 输入坐标为投影坐标（未进行缩放、平移）时为 True
+        :return: numpy.ndarray int 各点所在分区，不在河南省境内的点为 -1
+        """
+        x, y = self.planar(x, y, projected)
+        self.check_region(x, y)
+        px, py = x.ravel(), y.ravel()
+        areas = np.full(px.shape, -1, dtype=int)
+        for area, polygon in self.polygons.items():
+            rest = np.flatnonzero(areas < 0)
+            if not len(rest):
+                break
+            areas[rest[polygon.contains(px[rest], py[rest])]] = area
+        return areas.reshape(x.shape)
 
 
 @singleton
@@ -236,3 +851,117 @@ class Contour84T23(ContourInterface):
     transform_param = tp.Contour84T23.transform_param
     geo_data = geo.HN84T23
 
+
+
+# 流域暴雨参数名称及其对应的等值线图
+STREAM_PARAM_BANDS = (
+    ('h_10min', Contour84T02),
+    ('cv_10min', Contour84T03),
+    ('h_1h', Contour84T05),
+    ('cv_1h', Contour84T06),
+    ('h_6h', Contour84T08),
+    ('cv_6h', Contour84T09),
+    ('h_24h', Contour84T11),
+    ('cv_24h', Contour84T12),
+    ('n1', Contour84T21),
+    ('n2', Contour84T22),
+    ('n3', Contour84T23),
+)
+
+
+@singleton
+class StreamParamCube(ChunkedLookup):
+    """
+    暴雨参数多波段查询：将水文分区图及 11 幅暴雨参数等值线图叠加为一个多波段数据，
+    一次查询返回指定坐标点的水文分区及全部暴雨参数。
+    """
+    bands = STREAM_PARAM_BANDS
+    dtype = np.dtype(
+        [('lng', float), ('lat', float), ('area', int)] + [(name, float) for name, _ in bands]
+    )
+
+    def __init__(self, bbox=None, margin=0.1):
+        """
+        :param bbox: (min_lng, min_lat, max_lng, max_lat) 仅加载指定区域的数据，为 None 时使用全图单例，见 load_region
+        :param margin: float 区域安全边距（度）
+        """
+        if bbox is None:
+            self.area_map = Area84TJ()
+            self.maps = [(name, cls()) for name, cls in self.bands]
+        else:
+            self.area_map = load_region(Area84TJ, bbox, margin)
+            self.maps = [(name, load_region(cls, bbox, margin)) for name, cls in self.bands]
+
+    def use_fallback(self, mode='nearest', **kwargs):
+        """对全部等值线图设置三角网以外的点的取值方法，参数见 ContourInterface.use_fallback"""
+        for _, m in self.maps:
+            m.use_fallback(mode, **kwargs)
+
+    def lookup(self, lngs, lats, return_mask=False):
+        """
+        批量查询
+        :param lngs: array_like 经度
+        :param lats: array_like 纬度
+        :param return_mask: bool 是否同时返回使用了邻近散点取值的点
+        :return: numpy.ndarray 结构化数组，字段为 dtype 中的 lng、lat、area、h_10min …… n3；
+                 不在河南省境内的点 area 为 -1，等值线图范围以外（且未设置 fallback）的值为 nan；
+                 return_mask 为 True 时返回 (result, mask)，mask 为 bool 数组，任一参数使用了邻近散点取值的点为 True
+        """
+        lngs, lats = np.broadcast_arrays(np.asarray(lngs, dtype=float), np.asarray(lats, dtype=float))
+        result, mask = self.lookup_planar(self.to_planar(lngs, lats), return_mask=True)
+        result['lng'] = lngs
+        result['lat'] = lats
+        return (result, mask) if return_mask else result
+
+    def to_planar(self, lngs, lats):
+        """
+        批量将经纬度坐标转换至水文分区图及各等值线图的平面坐标
+        :param lngs: array_like 经度
+        :param lats: array_like 纬度
+        :return: dict {图幅类名: numpy.ndarray shape=(..., 2) 平面坐标}，可直接用于 lookup_planar
+        """
+        return to_planar([self.area_map] + [m for _, m in self.maps], lngs, lats)
+
+    def lookup_planar(self, coords, return_mask=False):
+        """
+        以各图幅的平面坐标批量查询（不进行经纬度坐标转换）
+        :param coords: dict {图幅类名: numpy.ndarray shape=(..., 2) 平面坐标}，见 to_planar
+        :param return_mask: bool 是否同时返回使用了邻近散点取值的点
+        :return: numpy.ndarray 结构化数组，字段同 lookup，lng、lat 为 nan；
+                 return_mask 为 True 时返回 (result, mask)
+        """
+        shape = np.shape(coords[type(self.area_map).__name__])[:-1]
+        result = np.empty(shape, dtype=self.dtype)
+        result['lng'] = np.nan
+        result['lat'] = np.nan
+        result['area'] = self.area_map.lookup_planar(coords[type(self.area_map).__name__])
+        mask = np.zeros(shape, dtype=bool)
+        for name, m in self.maps:
+            result[name], used = m.interpolate(*m.planar(coords[type(m).__name__]))
+            mask |= used
+        return (result, mask) if return_mask else result
+
+    def __call__(self, lng: float, lat: float):
+        """
+        查询单个坐标点
+        :param lng: 经度
+        :param lat: 纬度
+        :return: numpy.void 单条记录，字段同 lookup
+        """
+        # 单点查询：投影字符串相同的图幅只进行一次投影计算，各图幅逐点插值（不经过批量计算）
+        projected = {}
+
+        def planar(m):
+            if m.proj_string not in projected:
+                projected[m.proj_string] = np.array(m.proj(lng, lat))
+            return (projected[m.proj_string] - m.dxy) / m.k
+
+        record = np.empty((), dtype=self.dtype)
+        record['lng'] = lng
+        record['lat'] = lat
+        record['area'] = self.area_map.find_area(*planar(self.area_map))
+        if record['area'] < 0:
+            raise CoordNotInHeNanError('输入的坐标不在河南省内！')
+        for name, m in self.maps:
+            record[name] = m.value(*planar(m))
+        return record[()]
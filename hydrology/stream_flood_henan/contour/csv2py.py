@@ -2,6 +2,11 @@ import os
 import json
 import pandas as pd
 
+try:
+    from . import store
+except ImportError:
+    import store
+
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 curve_data_dir = os.path.join(BASE_DIR, 'data', 'contour')
@@ -17,26 +22,55 @@ def gen_format(li, var, n, l, xs, tn=0):
     return dm
 
 
-def gen(file_path):
-    dm = ''
+def read_csv_data():
+    """读取矢量化的等值线 csv 数据，返回 [(图幅名称, x, y, z), ...]"""
+    data = []
     for _ in os.listdir(curve_data_dir):
         if _.endswith('.csv'):
             df = pd.read_csv(os.path.join(curve_data_dir, _), encoding='gbk')
             x = list(df.get('X轴'))
-            xd = gen_format(x, 'x', 11, 7, 1, 1)
             y = list(df.get('Y轴'))
-            yd = gen_format(y, 'y', 11, 7, 1, 1)
             z = list(df.get('Z轴'))
-            zd = gen_format(z, 'z', 12, 7, 2, 1)
-            dm += 'class HN%s:\n%s\n\n%s\n\n%s\n\n\n' % (
-                _.replace('.csv', ''), xd.rstrip(), yd.rstrip(), zd.rstrip()
-            )
+            data.append(('HN%s' % _.replace('.csv', ''), x, y, z))
+    return data
+
+
+def read_module_data(module):
+    """读取已生成的 geo.py 模块中的等值线数据，返回 [(图幅名称, x, y, z), ...]"""
+    return [
+        (name, obj.x, obj.y, obj.z) for name, obj in vars(module).items()
+        if name.startswith('HN') and hasattr(obj, 'z')
+    ]
+
+
+def gen(file_path):
+    dm = ''
+    for name, x, y, z in read_csv_data():
+        xd = gen_format(x, 'x', 11, 7, 1, 1)
+        yd = gen_format(y, 'y', 11, 7, 1, 1)
+        zd = gen_format(z, 'z', 12, 7, 2, 1)
+        dm += 'class %s:\n%s\n\n%s\n\n%s\n\n\n' % (
+            name, xd.rstrip(), yd.rstrip(), zd.rstrip()
+        )
 
     with open(file_path, 'w', encoding='utf-8') as f:
         f.write(dm.replace('\t', '    '))
     return dm
 
 
+def gen_binary(file_path, data=None):
+    """
+    生成二进制等值线数据（供 chart.py 以内存映射方式加载）
+    :param file_path: str .npy 文件路径，各图幅的起止行号写入同名 .json 文件
+    :param data: list [(图幅名称, x, y, z), ...]，默认读取 csv 数据。
+                 由 geo.py 转换时可使用 read_module_data(geo)
+    """
+    if data is None:
+        data = read_csv_data()
+    store.save(file_path, data)
+    return data
+
+
 # def gen():
 #     ini = ''
 #     for _ in os.listdir():
@@ -94,3 +128,4 @@ def gen(file_path):
 
 if __name__ == '__main__':
     gen('geo.py')
+    gen_binary('geo.npy')
@@ -0,0 +1,145 @@
+"""
+等值线栅格模块：
+    ContourGrid 将三角网插值结果预先采样到规则网格（平面坐标），查询时使用双线性插值，查询耗时与数据量无关。
+    网格数据保存为 .npy 文件（以内存映射方式加载），网格参数保存在同名 .json 文件中。
+"""
+import os
+import json
+
+import numpy as np
+
+
+class ContourGrid(object):
+    """规则网格上的等值线值，双线性插值"""
+
+    def __init__(self, values, origin, cell_size, max_error=None, exact=None):
+        """
+        :param values: numpy.ndarray shape=(ny, nx) 网格节点处的值，三角网以外为 nan
+        :param origin: (x0, y0) 网格左下角节点的平面坐标
+        :param cell_size: float 网格间距（平面坐标单位）
+        :param max_error: float 与精确三角网插值相比的最大偏差
+        :param exact: callable 精确插值对象 f(x, y)，网格边缘无法双线性插值的点使用其计算
+        """
+        self.values = values
+        self.origin = np.asarray(origin, dtype=float)
+        self.cell_size = float(cell_size)
+        self.max_error = max_error
+        self.exact = exact
+
+    @classmethod
+    def from_triangulation(cls, tri, cell_size, dtype=np.float32):
+        """
+        对三角网进行栅格化采样
+        :param tri: Triangulation 三角网
+        :param cell_size: float 网格间距（平面坐标单位）
+        :param dtype: 网格数据类型
+        :return: ContourGrid
+        """
+        origin = np.floor(tri.min_bound / cell_size) * cell_size
+        nx, ny = np.maximum(np.ceil((tri.max_bound - origin) / cell_size).astype(int) + 1, 2)
+        xs = origin[0] + np.arange(nx) * cell_size
+        ys = origin[1] + np.arange(ny) * cell_size
+        gx, gy = np.meshgrid(xs, ys)
+        values = tri(gx, gy).astype(dtype)
+        grid = cls(values, origin, cell_size, exact=tri)
+        grid.max_error = grid.deviation(tri)
+        return grid
+
+    def deviation(self, tri):
+        """
+        计算网格插值与精确三角网插值的最大偏差。
+        检查点为三角网的全部顶点、各边中点及各三角形重心（线性插值的最大偏差出现在这些位置附近）。
+        :param tri: Triangulation 三角网
+        :return: float 最大偏差（绝对值）
+        """
+        p = tri.points[tri.simplices]
+        checks = np.concatenate([
+            tri.points,
+            (p[:, 0] + p[:, 1]) / 2.0, (p[:, 1] + p[:, 2]) / 2.0, (p[:, 2] + p[:, 0]) / 2.0,
+            p.mean(axis=1),
+        ])
+        exact = tri(checks[:, 0], checks[:, 1])
+        approx = self.bilinear(checks[:, 0], checks[:, 1])
+        diff = np.abs(approx - exact)
+        return float(np.nanmax(diff)) if np.any(np.isfinite(diff)) else 0.0
+
+    def save(self, path, key=''):
+        """
+        保存网格：path 为 .npy 数据文件路径，参数写入同名 .json 文件
+        :param path: str .npy 文件路径
+        :param key: str 原始数据校验值
+        """
+        np.save(path, self.values)
+        meta = dict(
+            key=key, origin=self.origin.tolist(), cell_size=self.cell_size,
+            max_error=self.max_error, shape=list(self.values.shape),
+        )
+        with open(os.path.splitext(path)[0] + '.json', 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+
+    @classmethod
+    def load(cls, path, key=None, exact=None):
+        """
+        以内存映射方式加载网格
+        :param path: str .npy 文件路径
+        :param key: str 校验值，与记录不一致时返回 None
+        :param exact: callable 精确插值对象
+        :return: ContourGrid or None
+        """
+        try:
+            with open(os.path.splitext(path)[0] + '.json', encoding='utf-8') as f:
+                meta = json.load(f)
+            if key is not None and meta.get('key') != key:
+                return None
+            values = np.load(path, mmap_mode='r')
+        except (OSError, ValueError):
+            return None
+        return cls(values, meta['origin'], meta['cell_size'], meta.get('max_error'), exact)
+
+    def bilinear(self, x, y):
+        """
+        双线性插值（不处理边缘，网格以外或相邻节点含 nan 时返回 nan）
+        :param x: array_like 平面坐标x轴
+        :param y: array_like 平面坐标y轴
+        :return: numpy.ndarray float
+        """
+        x, y = np.broadcast_arrays(np.asarray(x, dtype=float), np.asarray(y, dtype=float))
+        ny, nx = self.values.shape
+        fx = (x - self.origin[0]) / self.cell_size
+        fy = (y - self.origin[1]) / self.cell_size
+        valid = (fx >= 0) & (fx <= nx - 1) & (fy >= 0) & (fy <= ny - 1)
+        result = np.full(x.shape, np.nan)
+        fx, fy = fx[valid], fy[valid]
+        i = np.minimum(fx.astype(np.intp), nx - 2)
+        j = np.minimum(fy.astype(np.intp), ny - 2)
+        tx, ty = fx - i, fy - j
+        v = self.values
+        result[valid] = (
+            v[j, i] * (1 - tx) * (1 - ty) + v[j, i + 1] * tx * (1 - ty) +
+            v[j + 1, i] * (1 - tx) * ty + v[j + 1, i + 1] * tx * ty
+        )
+        return result
+
+    def __call__(self, x, y):
+        """
+        双线性插值，网格边缘无法插值的点使用精确插值对象计算
+        :param x: array_like 平面坐标x轴
+        :param y: array_like 平面坐标y轴
+        :return: numpy.ndarray float
+        """
+        x, y = np.broadcast_arrays(np.asarray(x, dtype=float), np.asarray(y, dtype=float))
+        result = self.bilinear(x, y)
+        if self.exact is not None:
+            missing = np.isnan(result)
+            if missing.any():
+                result[missing] = self.exact(x[missing], y[missing])
+        return result
+
+    def value(self, x: float, y: float):
+        """
+        单点插值
+        :param x: float 平面坐标x轴
+        :param y: float 平面坐标y轴
+        :return: float
+        """
+        return float(self(x, y))
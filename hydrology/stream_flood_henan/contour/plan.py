@@ -0,0 +1,177 @@
+"""
+预编译查询计划：
+    对固定的站点列表反复查询等值线图时，坐标转换、三角形定位及重心坐标（插值权重）每次都相同。
+    QueryPlan 对站点列表一次性完成上述计算，记录各图幅中每个站点所在三角形的顶点索引及权重，
+    再次求值时每幅图只需一次取值及加权求和。
+    图幅设置了 fallback（见 ContourInterface.use_fallback）时，三角网以外的站点同样记录参与取值的邻近散点及其权重。
+    查询计划可保存为 .npz 文件，文件中记录了各图幅三角网及转换参数的校验值，
+    等值线数据或转换参数变化后加载时自动拒绝（返回 None）。
+"""
+import os
+
+import numpy as np
+
+from .chart import project_to_maps
+from .tin import checksum
+
+
+def map_key(m):
+    """
+    图幅的校验值（三角网散点、散点处的值、转换参数及 fallback 设置）
+    :param m: ContourInterface 实例
+    :return: str
+    """
+    tri = m.triangulation
+    fallback = m.fallback
+    if fallback is not None:
+        fallback = '%s,%d,%r,%r' % (fallback, m.fallback_k, m.fallback_power, m.fallback_distance)
+    return '%s|%s|%s' % (checksum(tri.points, tri.values, [m.k], m.dxy), m.proj_string, fallback)
+
+
+class QueryPlan(object):
+    """固定站点列表在多幅等值线图上的查询计划"""
+
+    def __init__(self, lngs, lats, maps, vertices, weights, fallbacks=None):
+        """
+        :param lngs: numpy.ndarray shape=(n,) 站点经度
+        :param lats: numpy.ndarray shape=(n,) 站点纬度
+        :param maps: list ContourInterface 实例
+        :param vertices: dict {图幅名称: numpy.ndarray shape=(n, 3)} 站点所在三角形的顶点索引
+        :param weights: dict {图幅名称: numpy.ndarray shape=(n, 3)} 顶点权重，三角网以外的站点为 nan
+        :param fallbacks: dict {图幅名称: (index, vertices, weights)} 使用邻近散点取值的站点序号 shape=(m,)、
+                          散点索引 shape=(m, k) 及权重 shape=(m, k)；未设置 fallback 的图幅可省略
+        """
+        self.lngs = lngs
+        self.lats = lats
+        self.maps = {type(m).__name__: m for m in maps}
+        self.vertices = vertices
+        self.weights = weights
+        self.fallbacks = fallbacks or {}
+
+    @classmethod
+    def compile(cls, maps, lngs, lats):
+        """
+        编译查询计划（使用三角网精确插值，与图幅当前使用的插值引擎无关；
+        三角网以外的站点按图幅的 fallback 设置记录邻近散点及权重，与 ContourInterface.lookup 的结果一致）
+        :param maps: list ContourInterface 实例，如 [contour.Contour84T02(), contour.Contour84T05()]
+        :param lngs: array_like 站点经度
+        :param lats: array_like 站点纬度
+        :return: QueryPlan
+        """
+        lngs, lats = np.broadcast_arrays(np.asarray(lngs, dtype=float), np.asarray(lats, dtype=float))
+        lngs, lats = lngs.ravel(), lats.ravel()
+        vertices, weights, fallbacks = {}, {}, {}
+        for m, (x, y) in zip(maps, project_to_maps(maps, lngs, lats)):
+            m.check_region(x, y)
+            tri = m.triangulation
+            simplex = tri.find_simplex(x, y)
+            found = simplex >= 0
+            v = np.zeros((len(lngs), 3), dtype=np.intp)
+            w = np.full((len(lngs), 3), np.nan)
+            v[found] = tri.simplices[simplex[found]]
+            w[found] = tri.barycentric(np.stack([x[found], y[found]], axis=-1), simplex[found])
+            name = type(m).__name__
+            vertices[name], weights[name] = v, w
+            if m.fallback is not None:
+                index = np.flatnonzero(~found)
+                fv, fw = m.neighbor_weights(x[index], y[index])
+                fallbacks[name] = (index, fv, fw)
+        return cls(lngs, lats, maps, vertices, weights, fallbacks)
+
+    def names(self):
+        return list(self.maps.keys())
+
+    def evaluate(self, name, return_mask=False):
+        """
+        对单幅图求值
+        :param name: str 图幅名称，如 Contour84T02
+        :param return_mask: bool 是否同时返回使用了邻近散点取值的站点
+        :return: numpy.ndarray float 各站点处的值，三角网以外（且未设置 fallback）的站点为 nan；
+                 return_mask 为 True 时返回 (values, mask)
+        """
+        values = self.maps[name].triangulation.values
+        result = np.einsum('ij,ij->i', values[self.vertices[name]], self.weights[name])
+        mask = np.zeros(len(result), dtype=bool)
+        if name in self.fallbacks:
+            index, fv, fw = self.fallbacks[name]
+            result[index] = np.einsum('ij,ij->i', values[fv], fw)
+            mask[index] = ~np.isnan(result[index])
+        return (result, mask) if return_mask else result
+
+    def __call__(self, return_mask=False):
+        """
+        对全部图幅求值
+        :param return_mask: bool 是否同时返回使用了邻近散点取值的站点
+        :return: dict {图幅名称: numpy.ndarray float}；return_mask 为 True 时值为 (values, mask)
+        """
+        return {name: self.evaluate(name, return_mask) for name in self.maps}
+
+    def __len__(self):
+        return len(self.lngs)
+
+    def save(self, path):
+        """
+        保存查询计划至 .npz 文件
+        :param path: str 文件路径
+        """
+        arrays = dict(lngs=self.lngs, lats=self.lats, names=np.array(self.names()))
+        for name, m in self.maps.items():
+            arrays['key_' + name] = np.array(map_key(m))
+            arrays['vertices_' + name] = self.vertices[name]
+            arrays['weights_' + name] = self.weights[name]
+            if name in self.fallbacks:
+                index, fv, fw = self.fallbacks[name]
+                arrays['fallback_index_' + name] = index
+                arrays['fallback_vertices_' + name] = fv
+                arrays['fallback_weights_' + name] = fw
+        tmp = '%s.%d.tmp' % (path, os.getpid())
+        with open(tmp, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path, maps):
+        """
+        从 .npz 文件加载查询计划
+        :param path: str 文件路径
+        :param maps: list ContourInterface 实例，须与编译时的图幅一致
+        :return: QueryPlan；文件不存在、图幅不一致或任一图幅的校验值与记录不一致时返回 None
+        """
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                names = [type(m).__name__ for m in maps]
+                if list(data['names']) != names:
+                    return None
+                vertices, weights, fallbacks = {}, {}, {}
+                for name, m in zip(names, maps):
+                    if str(data['key_' + name]) != map_key(m):
+                        return None
+                    vertices[name] = data['vertices_' + name]
+                    weights[name] = data['weights_' + name]
+                    if m.fallback is not None:
+                        fallbacks[name] = tuple(data['fallback_%s_%s' % (key, name)]
+                                                for key in ('index', 'vertices', 'weights'))
+                return cls(data['lngs'], data['lats'], maps, vertices, weights, fallbacks)
+        except (OSError, KeyError, ValueError):
+            return None
+
+    @classmethod
+    def load_or_compile(cls, path, maps, lngs, lats):
+        """
+        优先从文件加载查询计划，文件不存在、已失效或站点列表不一致时重新编译并保存
+        :param path: str 文件路径
+        :param maps: list ContourInterface 实例
+        :param lngs: array_like 站点经度
+        :param lats: array_like 站点纬度
+        :return: QueryPlan
+        """
+        lngs, lats = np.broadcast_arrays(np.asarray(lngs, dtype=float), np.asarray(lats, dtype=float))
+        lngs, lats = lngs.ravel(), lats.ravel()
+        plan = cls.load(path, maps) if os.path.exists(path) else None
+        if plan is None or not (np.array_equal(plan.lngs, lngs) and np.array_equal(plan.lats, lats)):
+            plan = cls.compile(maps, lngs, lats)
+            try:
+                plan.save(path)
+            except OSError:
+                pass
+        return plan
@@ -0,0 +1,109 @@
+"""
+等值线数据的二进制存储：
+    全部图幅的散点数据按 [x, y, z] 依次存放在一个 float64 的 .npy 文件中（形状为 (n, 3)），
+    同名 .json 文件记录各图幅在其中的起止行号。加载时使用内存映射，无需解析 Python 字面量，
+    由同一父进程派生的多个工作进程可以共享同一份物理内存页。
+"""
+import os
+import json
+
+import numpy as np
+
+RESOURCE_DIR = os.path.dirname(os.path.abspath(__file__))
+GEO_BINARY_PATH = os.path.join(RESOURCE_DIR, 'geo.npy')
+
+
+class GeoData(object):
+    """单幅等值线图的散点数据，与 geo.py 中各数据类的接口一致（x、y、z）"""
+
+    def __init__(self, name, data):
+        """
+        :param name: str 图幅名称，如 HN84T02
+        :param data: numpy.ndarray shape=(n, 3) [x, y, z]
+        """
+        self.__name__ = name
+        self.data = data
+
+    @property
+    def x(self):
+        return self.data[:, 0]
+
+    @property
+    def y(self):
+        return self.data[:, 1]
+
+    @property
+    def z(self):
+        return self.data[:, 2]
+
+    def __len__(self):
+        return len(self.data)
+
+    def __repr__(self):
+        return '<GeoData %s (%d points)>' % (self.__name__, len(self))
+
+
+class GeoDataset(object):
+    """全部图幅的散点数据，按图幅名称以属性方式访问（geo.HN84T02）"""
+
+    def __init__(self, data, index):
+        """
+        :param data: numpy.ndarray shape=(n, 3) 全部图幅的散点数据
+        :param index: dict {图幅名称: [起始行, 结束行)}
+        """
+        self.data = data
+        self.index = index
+
+    def names(self):
+        return list(self.index.keys())
+
+    def __getattr__(self, name):
+        # 仅在首次访问某图幅时调用，创建的 GeoData 对象缓存为实例属性
+        index = self.__dict__.get('index', {})
+        if name not in index:
+            raise AttributeError(name)
+        start, stop = index[name]
+        item = GeoData(name, self.data[start:stop])
+        setattr(self, name, item)
+        return item
+
+
+def index_path(path):
+    return os.path.splitext(path)[0] + '.json'
+
+
+def save(path, data):
+    """
+    保存二进制等值线数据
+    :param path: str .npy 文件路径，索引写入同名 .json 文件
+    :param data: iterable [(name, x, y, z), ...]
+    """
+    index, blocks, start = {}, [], 0
+    for name, x, y, z in data:
+        block = np.array([x, y, z], dtype=np.float64).T
+        index[name] = [start, start + len(block)]
+        start += len(block)
+        blocks.append(block)
+    np.save(path, np.concatenate(blocks) if blocks else np.empty((0, 3)))
+    with open(index_path(path), 'w', encoding='utf-8') as f:
+        json.dump(index, f)
+
+
+def load(path=GEO_BINARY_PATH, mmap_mode='r'):
+    """
+    加载二进制等值线数据
+    :param path: str .npy 文件路径
+    :param mmap_mode: str 内存映射模式，为 None 时读入内存
+    :return: GeoDataset
+    """
+    with open(index_path(path), encoding='utf-8') as f:
+        index = json.load(f)
+    return GeoDataset(np.load(path, mmap_mode=mmap_mode), index)
+
+
+def load_geo(path=GEO_BINARY_PATH):
+    """优先加载二进制等值线数据，二进制文件不存在时使用 geo.py 模块"""
+    if os.path.exists(path) and os.path.exists(index_path(path)):
+        return load(path)
+    from . import geo
+    return geo
@@ -0,0 +1,339 @@
+"""
+不规则三角网（TIN）线性插值模块：
+    Triangulation 由等值线散点构建的 Delaunay 三角网及其线性插值。
+    三角网（points、simplices、neighbors）及三角形定位所用的网格索引可保存为 .npz 缓存文件，
+    再次加载时无需重新运行 Qhull 及建立索引，
+    缓存文件中记录了原始数据的校验值，原始数据变化后缓存自动失效并重新构建。
+"""
+import os
+import math
+import hashlib
+
+import numpy as np
+from scipy.spatial import Delaunay
+
+# 缓存文件格式版本，格式变化时修改此值使旧缓存失效
+CACHE_VERSION = 2
+
+
+def checksum(*arrays):
+    """
+    计算数据的校验值
+    :param arrays: array_like 参与计算的数组
+    :return: str sha1 校验值
+    """
+    h = hashlib.sha1(('tin-v%d' % CACHE_VERSION).encode())
+    for a in arrays:
+        h.update(np.ascontiguousarray(a, dtype=np.float64).tobytes())
+    return h.hexdigest()
+
+
+class Triangulation(object):
+    """Delaunay 三角网，提供三角形定位及线性插值"""
+    eps = 1e-10  # 判断点位于三角形内部（含边界）时的容差
+    small_size = 16  # 点数不超过此值时逐点定位（不经过批量行走），用于单点查询
+
+    def __init__(self, points, simplices, neighbors, values, index=None):
+        """
+        :param points: numpy.ndarray shape=(n, 2) 散点平面坐标
+        :param simplices: numpy.ndarray shape=(m, 3) 三角形顶点索引
+        :param neighbors: numpy.ndarray shape=(m, 3) 三角形相邻三角形索引，-1 表示位于凸包边界
+        :param values: numpy.ndarray shape=(n,) 散点处的值
+        :param index: tuple (cell_offsets, cell_tris, cell_start) 已建立的网格索引（如由缓存文件读取的），
+                      为 None 时在首次定位时建立，见 __build_index
+        """
+        self.points = np.asarray(points, dtype=float)
+        self.simplices = np.asarray(simplices, dtype=np.intp)
+        self.neighbors = np.asarray(neighbors, dtype=np.intp)
+        self.values = np.asarray(values, dtype=float)
+        self.transform = self.get_transform(self.points, self.simplices)
+        self.min_bound = self.points.min(axis=0)
+        self.max_bound = self.points.max(axis=0)
+        n = max(1, int(np.sqrt(len(self.simplices))))
+        self.shape = (n, n)
+        self.cell_size = np.maximum((self.max_bound - self.min_bound) / n, 1e-12)
+        # 单点定位使用的 Python 浮点数（避免 numpy 标量运算的开销）
+        self.__bounds = tuple(float(v) for v in np.concatenate([self.min_bound, self.max_bound, self.cell_size]))
+        self.cell_offsets = self.cell_tris = self.cell_table = self.cell_start = None
+        if index is not None:
+            self.__set_index(*index)
+
+    @classmethod
+    def from_points(cls, points, values):
+        """由散点构建三角网（运行 Qhull）"""
+        points = np.asarray(points, dtype=float)
+        tri = Delaunay(points)
+        return cls(points, tri.simplices, tri.neighbors, values)
+
+    @classmethod
+    def load(cls, path, key=None):
+        """
+        从 .npz 缓存文件加载三角网
+        :param path: str 缓存文件路径
+        :param key: str 校验值，与缓存记录不一致时返回 None
+        :return: Triangulation or None
+        """
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                if key is not None and str(data['key']) != key:
+                    return None
+                return cls(
+                    data['points'], data['simplices'], data['neighbors'], data['values'],
+                    index=(data['cell_offsets'], data['cell_tris'], data['cell_start']),
+                )
+        except (OSError, KeyError, ValueError):
+            return None
+
+    def save(self, path, key=''):
+        """
+        将三角网（含网格索引）保存至 .npz 缓存文件
+        :param path: str 缓存文件路径
+        :param key: str 校验值
+        """
+        self.__ensure_index()
+        tmp = '%s.%d.tmp' % (path, os.getpid())
+        with open(tmp, 'wb') as f:
+            np.savez(
+                f, key=np.array(key), points=self.points, simplices=self.simplices,
+                neighbors=self.neighbors, values=self.values, cell_offsets=self.cell_offsets.astype(np.int32),
+                cell_tris=self.cell_tris.astype(np.int32), cell_start=self.cell_start.astype(np.int32),
+            )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load_or_build(cls, points, values, path=None):
+        """
+        优先从缓存文件加载三角网，缓存不存在或已失效时重新构建并写入缓存
+        :param points: array_like shape=(n, 2) 散点平面坐标
+        :param values: array_like shape=(n,) 散点处的值
+        :param path: str 缓存文件路径，为 None 时不使用缓存
+        :return: Triangulation
+        """
+        points = np.asarray(points, dtype=float)
+        values = np.asarray(values, dtype=float)
+        if path is None:
+            return cls.from_points(points, values)
+        key = checksum(points, values)
+        tri = cls.load(path, key) if os.path.exists(path) else None
+        if tri is None:
+            tri = cls.from_points(points, values)
+            try:
+                tri.save(path, key)
+            except OSError:
+                # 目录不可写时仅放弃缓存，不影响计算
+                pass
+        return tri
+
+    @staticmethod
+    def get_transform(points, simplices):
+        """
+        计算各三角形的重心坐标变换矩阵（与 scipy.spatial.Delaunay.transform 一致）
+        :return: numpy.ndarray shape=(m, 3, 2)，[:, :2] 为逆矩阵，[:, 2] 为第三个顶点坐标
+        """
+        p = points[simplices]
+        r = p[:, 2]
+        a = (p[:, :2] - r[:, None, :]).transpose(0, 2, 1)
+        det = a[:, 0, 0] * a[:, 1, 1] - a[:, 0, 1] * a[:, 1, 0]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            inv = np.empty_like(a)
+            inv[:, 0, 0] = a[:, 1, 1] / det
+            inv[:, 0, 1] = -a[:, 0, 1] / det
+            inv[:, 1, 0] = -a[:, 1, 0] / det
+            inv[:, 1, 1] = a[:, 0, 0] / det
+        inv[det == 0] = np.nan
+        return np.concatenate([inv, r[:, None, :]], axis=1)
+
+    def __ensure_index(self):
+        if self.cell_table is None:
+            self.__build_index()
+
+    def __build_index(self):
+        """
+        按三角形外包矩形建立均匀网格索引：
+            cell_tris[cell_offsets[c]:cell_offsets[c + 1]] 为与网格 c 相交的全部三角形（cell_table 为其按行补齐的二维表）；
+            cell_start 记录各网格中心所在（或相近）的三角形，作为沿相邻三角形行走定位的起点。
+        """
+        n = self.shape[0]
+        p = self.points[self.simplices]
+        lo = p.min(axis=1)
+        hi = p.max(axis=1)
+        c0 = self.__cell_ij(lo)
+        c1 = self.__cell_ij(hi)
+        w = c1[:, 0] - c0[:, 0] + 1
+        counts = w * (c1[:, 1] - c0[:, 1] + 1)
+        tris = np.repeat(np.arange(len(self.simplices)), counts)
+        k = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        cells = (c0[tris, 1] + k // w[tris]) * n + c0[tris, 0] + k % w[tris]
+
+        order = np.argsort(cells, kind='stable')
+        cells, tris = cells[order], tris[order]
+        offsets = np.searchsorted(cells, np.arange(n * n + 1))
+        self.__set_index(offsets, tris, None)
+
+        # 各网格中心所在的三角形：逐一检查与网格相交的三角形（按压缩存储逐对计算，不经过补齐的二维表）
+        j, i = np.divmod(cells, n)
+        centers = self.min_bound + (np.stack([i, j], axis=-1) + 0.5) * self.cell_size
+        hit = np.flatnonzero(np.all(self.barycentric(centers, tris) >= -self.eps, axis=-1))
+        hit_cells, first = np.unique(cells[hit], return_index=True)
+        start = np.maximum(self.cell_table[:, 0], 0)
+        start[hit_cells] = tris[hit[first]]
+        self.cell_start = start
+
+    def __set_index(self, offsets, tris, start):
+        """由压缩存储的网格索引生成按行补齐的二维表"""
+        offsets = np.asarray(offsets, dtype=np.intp)
+        tris = np.asarray(tris, dtype=np.intp)
+        cells = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+        table = np.full((len(offsets) - 1, max(1, np.diff(offsets).max())), -1, dtype=np.intp)
+        table[cells, np.arange(len(cells)) - offsets[cells]] = tris
+        self.cell_offsets, self.cell_tris, self.cell_table = offsets, tris, table
+        self.cell_start = None if start is None else np.asarray(start, dtype=np.intp)
+
+    def __cell_ij(self, xy):
+        ij = np.floor((xy - self.min_bound) / self.cell_size).astype(np.intp)
+        return np.clip(ij, 0, np.array(self.shape) - 1)
+
+    def __cell(self, xy):
+        ij = self.__cell_ij(xy)
+        return ij[:, 1] * self.shape[0] + ij[:, 0]
+
+    def barycentric(self, xy, simplex):
+        """
+        计算点在指定三角形中的重心坐标（线性插值权重）
+        :param xy: numpy.ndarray shape=(..., 2) 平面坐标
+        :param simplex: numpy.ndarray shape=(...) 三角形索引
+        :return: numpy.ndarray shape=(..., 3) 对应 simplices 中三个顶点的权重
+        """
+        t = self.transform[simplex]
+        d = xy - t[..., 2, :]
+        b0 = t[..., 0, 0] * d[..., 0] + t[..., 0, 1] * d[..., 1]
+        b1 = t[..., 1, 0] * d[..., 0] + t[..., 1, 1] * d[..., 1]
+        return np.stack([b0, b1, 1.0 - b0 - b1], axis=-1)
+
+    def find_simplex(self, x, y, chunk_size=65536):
+        """
+        定位点所在的三角形
+        :param x: array_like 平面坐标x轴
+        :param y: array_like 平面坐标y轴
+        :param chunk_size: int 每批处理的点数，用于限制内存占用
+        :return: numpy.ndarray int 三角形索引，位于三角网以外的点为 -1
+        """
+        self.__ensure_index()
+        x, y = np.broadcast_arrays(np.asarray(x, dtype=float), np.asarray(y, dtype=float))
+        if x.size <= self.small_size:
+            return np.array([self.find_simplex_point(a, b) for a, b in zip(x.flat, y.flat)],
+                            dtype=np.intp).reshape(x.shape)
+        xy = np.stack([x.ravel(), y.ravel()], axis=-1)
+        result = np.full(len(xy), -1, dtype=np.intp)
+        for i in range(0, len(xy), chunk_size):
+            result[i:i + chunk_size] = self.__find_simplex(xy[i:i + chunk_size])
+        return result.reshape(x.shape)
+
+    def find_simplex_point(self, x: float, y: float):
+        """
+        定位单个点所在的三角形（逐步行走，与批量定位的规则及结果一致）
+        :return: int 三角形索引，位于三角网以外的点为 -1
+        """
+        self.__ensure_index()
+        x_min, y_min, x_max, y_max, dx, dy = self.__bounds
+        if not (x_min <= x <= x_max and y_min <= y <= y_max):
+            return -1
+        n = self.shape[0]
+        i = min(max(math.floor((x - x_min) / dx), 0), n - 1)
+        j = min(max(math.floor((y - y_min) / dy), 0), n - 1)
+        simplex = int(self.cell_start[j * n + i])
+        for _ in range(len(self.simplices)):
+            (t00, t01), (t10, t11), (rx, ry) = self.transform[simplex].tolist()
+            dx, dy = x - rx, y - ry
+            b0 = t00 * dx + t01 * dy
+            b1 = t10 * dx + t11 * dy
+            b2 = 1.0 - b0 - b1
+            if b0 >= -self.eps and b1 >= -self.eps and b2 >= -self.eps:
+                return simplex
+            # 移向重心坐标最小（nan 视为最小）的顶点对边的相邻三角形
+            b = [-math.inf if math.isnan(v) else v for v in (b0, b1, b2)]
+            k = b.index(min(b))
+            simplex = int(self.neighbors[simplex, k])
+            if simplex < 0:
+                return -1
+        xy = np.array([[x, y]])
+        return int(self.__search_table(xy, np.array([j * n + i]))[0])
+
+    def __find_simplex(self, xy):
+        result = np.full(len(xy), -1, dtype=np.intp)
+        inside = np.flatnonzero(np.all((xy >= self.min_bound) & (xy <= self.max_bound), axis=1))
+        if not len(inside):
+            return result
+        cells = self.__cell(xy[inside])
+        found = self.__walk(xy[inside], self.cell_start[cells])
+        lost = found == -2
+        if lost.any():
+            found[lost] = self.__search_table(xy[inside][lost], cells[lost])
+        result[inside] = found
+        return result
+
+    def __walk(self, xy, simplex):
+        """
+        沿相邻三角形向目标点行走（每步移向重心坐标最小的顶点对边的相邻三角形），
+        返回所在三角形索引；越过凸包边界返回 -1；未能收敛返回 -2
+        """
+        result = np.full(len(xy), -2, dtype=np.intp)
+        active = np.arange(len(xy))
+        simplex = simplex.copy()
+        for _ in range(len(self.simplices)):
+            b = self.barycentric(xy[active], simplex)
+            b[np.isnan(b)] = -np.inf
+            j = b.argmin(axis=1)
+            done = b[np.arange(len(j)), j] >= -self.eps
+            result[active[done]] = simplex[done]
+            step = self.neighbors[simplex, j]
+            result[active[~done & (step < 0)]] = -1
+            keep = ~done & (step >= 0)
+            active, simplex = active[keep], step[keep]
+            if not len(active):
+                break
+        return result
+
+    def __search_table(self, xy, cells):
+        """在网格索引记录的全部候选三角形中逐一检查（行走定位失败时的兜底方法）"""
+        cands = self.cell_table[cells]
+        b = self.barycentric(xy[:, None, :], np.where(cands < 0, 0, cands))
+        hit = (cands >= 0) & np.all(b >= -self.eps, axis=-1)
+        first = hit.argmax(axis=1)
+        found = hit[np.arange(len(first)), first]
+        return np.where(found, cands[np.arange(len(first)), first], -1)
+
+    def __call__(self, x, y):
+        """
+        线性插值
+        :param x: array_like 平面坐标x轴
+        :param y: array_like 平面坐标y轴
+        :return: numpy.ndarray float 插值结果，位于三角网以外的点为 nan
+        """
+        x, y = np.broadcast_arrays(np.asarray(x, dtype=float), np.asarray(y, dtype=float))
+        if x.size <= self.small_size:
+            return np.array([self.value(a, b) for a, b in zip(x.flat, y.flat)]).reshape(x.shape)
+        simplex = self.find_simplex(x, y)
+        xy = np.stack([x, y], axis=-1)
+        found = simplex >= 0
+        result = np.full(x.shape, np.nan)
+        w = self.barycentric(xy[found], simplex[found])
+        result[found] = np.sum(self.values[self.simplices[simplex[found]]] * w, axis=-1)
+        return result
+
+    def value(self, x: float, y: float):
+        """
+        单点线性插值
+        :param x: float 平面坐标x轴
+        :param y: float 平面坐标y轴
+        :return: float 插值结果，位于三角网以外的点为 nan
+        """
+        simplex = self.find_simplex_point(x, y)
+        if simplex < 0:
+            return math.nan
+        (t00, t01), (t10, t11), (rx, ry) = self.transform[simplex].tolist()
+        dx, dy = x - rx, y - ry
+        b0 = t00 * dx + t01 * dy
+        b1 = t10 * dx + t11 * dy
+        v0, v1, v2 = self.values[self.simplices[simplex]].tolist()
+        return v0 * b0 + v1 * b1 + v2 * (1.0 - b0 - b1)
@@ -6,3 +6,8 @@ class CoordNotInHeNanError(Exception):
 class TransformParamError(Exception):
     """坐标转换参数错误"""
     pass
+
+
+class CoordNotInRegionError(Exception):
+    """坐标点不在已加载的区域范围内错误"""
+    pass
@@ -11,7 +11,7 @@ plt.rcParams['font.family'] = ['sans-serif']
 plt.rcParams['font.sans-serif'] = ['SimHei']
 plt.rcParams['axes.unicode_minus'] = False
 
-from ..relationship import Relationship
+from ..relationship import Relationship, RelationshipThetaM
 
 
 class ReasoningPeakFlow(object):
@@ -38,6 +38,21 @@ class ReasoningPeakFlow(object):
         self.n1, self.n2, self.n3 = n1, n2, n3
         self.mu, self.m = mu, m
 
+    @classmethod
+    def from_area(cls,
+        F: float, L: float, J: float, S: float,
+        n1: float, n2: float, n3: float, mu: float, area: int, method: str = 'fit'
+    ):
+        """
+        由84图集水文分区查θ~m关系图确定汇流参数m，其余参数同 __init__
+        :param area: int 84图集水文分区
+        :param method: str "fit"：使用拟合参数，默认值；"chart"：查关系图
+        :return: ReasoningPeakFlow
+        """
+        r = RelationshipThetaM()
+        m = r.m(area, r.theta(F, L, J), method)
+        return cls(F, L, J, S, n1, n2, n3, mu, m)
+
     def n(self, tau):
         if tau < 1:
             return self.n1
@@ -154,9 +169,8 @@ class FloodProcess(object):
             t = 1
 
         r = Relationship(self.flows)
-        hourly_r = {}
-        for i in np.arange(0, int(r.points[-1][0]) + 2, t):
-            hourly_r[i] = r(i)
+        ts = np.arange(0, int(r.points[-1][0]) + 2, t)
+        hourly_r = dict(zip(ts, r(ts)))
         qm_t, qm = sorted(r.points, key=lambda x: x[1])[-1]
         hourly_r[qm_t] = qm
 
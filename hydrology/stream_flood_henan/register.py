@@ -1,11 +1,139 @@
+"""
+单例注册器：
+    singleton 装饰器保证每个类只创建一个实例（线程安全，首次调用时创建）。
+    所有单例登记在模块级注册表中，可以预先加载（warm_up）、查看已加载的实例及其内存占用（loaded）、
+    释放实例（evict），用于长期运行的服务在内存与查询延迟之间进行权衡。
+"""
+import sys
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
+import numpy as np
 
-def singleton(cls):
-    """单例注册器"""
-    instance = {}
+# 单例注册表
+_registry = {}  # {类: 单例包装函数}
+_instances = {}  # {类: 实例}
+_locks = {}  # {类: 创建实例时使用的锁}
+_lock = threading.Lock()
 
+
+def _get_lock(cls):
+    with _lock:
+        return _locks.setdefault(cls, threading.RLock())
+
+
+def singleton(cls, register=True):
+    """
+    单例注册器
+    :param cls: 类
+    :param register: bool 是否登记在注册表中。运行时动态创建的类应为 False：
+                     实例及锁保存在包装函数中，随包装函数一同释放，不受 warm_up、evict、loaded 管理
+    """
+    if register:
+        instances, get_lock = _instances, _get_lock
+    else:
+        instances, lock = {}, threading.RLock()
+
+        def get_lock(_):
+            return lock
+
+    @functools.wraps(cls, updated=())
     def wrapper(*args, **kwargs):
-        if cls not in instance:
-            instance[cls] = cls(*args, **kwargs)
-        return instance[cls]
+        # 双重检查加锁：已创建时无需加锁；多个线程同时首次调用时只有一个线程创建实例
+        instance = instances.get(cls)
+        if instance is None:
+            with get_lock(cls):
+                instance = instances.get(cls)
+                if instance is None:
+                    instance = cls(*args, **kwargs)
+                    instances[cls] = instance
+        return instance
+    wrapper.cls = cls
+    if register:
+        _registry[cls] = wrapper
     return wrapper
+
+
+def _resolve(items):
+    """将单例包装函数或类统一转换为类；未指定时返回全部已登记的类"""
+    if not items:
+        return list(_registry.keys())
+    return [getattr(item, 'cls', item) for item in items]
+
+
+def install(item, instance):
+    """
+    将已创建的实例登记为单例（例如在其他线程或进程中创建的实例）
+    :param item: 单例包装函数或类
+    :param instance: 实例
+    """
+    cls = getattr(item, 'cls', item)
+    with _get_lock(cls):
+        _instances[cls] = instance
+    return instance
+
+
+def warm_up(*items, max_workers=None):
+    """
+    预先创建单例
+    :param items: 单例包装函数或类，如 contour.Contour84T02；未指定时创建全部已登记的单例
+    :param max_workers: int 并行创建使用的线程数，为 None 时依次创建
+    :return: list 创建的实例
+    """
+    wrappers = [_registry[cls] for cls in _resolve(items)]
+    if max_workers is None or max_workers <= 1:
+        return [wrapper() for wrapper in wrappers]
+    with ThreadPoolExecutor(max_workers) as executor:
+        return list(executor.map(lambda wrapper: wrapper(), wrappers))
+
+
+def evict(*items):
+    """
+    释放单例，下次调用时重新创建（已被其他对象引用的实例在引用解除前不会被回收）
+    :param items: 单例包装函数或类；未指定时释放全部单例
+    :return: list 被释放的类名
+    """
+    evicted = []
+    for cls in _resolve(items):
+        with _get_lock(cls):
+            if _instances.pop(cls, None) is not None:
+                evicted.append(cls.__name__)
+    return evicted
+
+
+def is_loaded(item):
+    """单例是否已创建"""
+    return getattr(item, 'cls', item) in _instances
+
+
+def loaded():
+    """
+    已创建的单例及其内存占用
+    :return: dict {类名: 内存占用（字节）}。内存占用包括实例引用的其他对象（例如 StreamParamCube 引用的各等值线图），
+             因此各项之和可能大于实际占用
+    """
+    return {cls.__name__: sizeof(instance) for cls, instance in list(_instances.items())}
+
+
+def sizeof(obj, _seen=None):
+    """
+    估算对象占用的内存（字节）：递归统计对象属性、容器元素及 numpy 数组的数据缓冲区。
+    以内存映射方式加载的数组数据由操作系统按需调入、多进程共享，不计入。
+    """
+    if _seen is None:
+        _seen = set()
+    if id(obj) in _seen:
+        return 0
+    _seen.add(id(obj))
+    if isinstance(obj, np.ndarray):
+        # 数组自身持有数据时包含数据缓冲区，视图及内存映射数组仅为数组头
+        return sys.getsizeof(obj)
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(sizeof(k, _seen) + sizeof(v, _seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(sizeof(item, _seen) for item in obj)
+    elif hasattr(obj, '__dict__') and not isinstance(obj, type):
+        size += sizeof(vars(obj), _seen)
+    return size
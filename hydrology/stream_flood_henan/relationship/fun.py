@@ -6,14 +6,43 @@ import os
 
 import numpy as np
 
-from . import mapping
+from . import store
 from ..register import singleton
 from ..exception import CoordNotInHeNanError
 
 RESOURCE_DIR = os.path.dirname(os.path.abspath(__file__))
 
+# 关系曲线数据：优先以内存映射方式加载二进制数据（mapping.npy，各曲线首次访问时读取），不存在时使用 mapping.py
+mapping = store.load_mapping()
+
+
+def prepare_points(points):
+    """
+    整理关系曲线散点
+    :param points: 矢量化的关系曲线散点[(x1, y1), (x2, y2), ...]
+    :return: tuple (xs, ys, slopes, monotone)
+             xs、ys 按 x 排序的散点（只读数组）；
+             slopes 各线段的斜率（x 重复的线段为 0，查询时不会落在此类线段内部）；
+             monotone 单调性：1 单调递增；-1 单调递减；0 不单调（不能反查）
+    """
+    points = np.array(points, dtype=float).reshape(-1, 2)
+    points = points[np.argsort(points[:, 0], kind='stable')]
+    xs, ys = points[:, 0].copy(), points[:, 1].copy()
+    dx, dy = np.diff(xs), np.diff(ys)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slopes = np.where(dx > 0, dy / dx, 0.0)
+    monotone = 0
+    if np.all(dy >= 0) and np.any(dy > 0):
+        monotone = 1
+    elif np.all(dy <= 0) and np.any(dy < 0):
+        monotone = -1
+    for a in (xs, ys, slopes):
+        a.flags.writeable = False
+    return xs, ys, slopes, monotone
+
 
 class RelationshipInterface(object):
+    __slots__ = ()
     points = None
     call_back_for_upper = None  # 如果指定此属性，超范围的使用回调函数计算返回值！否则当 X > max_X 返回 max_X—>Y; X < min_X 返回 min_X -> Y
     call_back_for_lower = None
@@ -21,28 +50,68 @@ class RelationshipInterface(object):
     def __init__(self):
         if self.points is None:
             raise NotImplementedError('未实现接口：%s；或实现接口时未设置必要参数' % self.__class__)
-        points = sorted(self.points, key=lambda x: x[0])
-        self.xs, self.ys = zip(*points)
+        self.xs, self.ys, self.slopes, self.monotone = prepare_points(self.points)
 
-    def linear_my(self, x: float):
+    def linear_my(self, x):
+        """
+        线性插值（二分查找所在线段）
+        :param x: float or array_like
+        :return: float or numpy.ndarray 与输入形状一致
+        """
         xs, ys = (self.xs, self.ys)
-        if x in xs:
-            return ys[xs.index(x)]
-        if x < xs[0]:
+        x = np.asarray(x, dtype=float)
+        # 与散点重合时取（第一个）该散点的值，否则由所在线段左端点及斜率计算
+        j = np.minimum(np.searchsorted(xs, x, side='left'), len(xs) - 1)
+        i = np.maximum(j, 1) - 1
+        result = np.where(xs[j] == x, ys[j], ys[i] + (x - xs[i]) * self.slopes[i])
+        lower = x < xs[0]
+        if np.any(lower):
+            result = np.where(lower, ys[0], result)
             if self.call_back_for_lower is not None:
-                return self.call_back_for_lower(x)
-            return ys[0]
-        if x > xs[-1]:
+                result[lower] = self.call_back_for_lower(x[lower])
+        upper = x > xs[-1]
+        if np.any(upper):
+            result = np.where(upper, ys[-1], result)
             if self.call_back_for_upper is not None:
-                return self.call_back_for_upper(x)
-            return ys[-1]
-        for i, x_in_xs in enumerate(xs[:-1]):
-            if x_in_xs < x < xs[i + 1]:
-                x1 = x_in_xs
-                x2 = xs[i + 1]
-                y1 = ys[i]
-                y2 = ys[i + 1]
-                return (x - x1) * (y2 - y1) / (x2 - x1) + y1
+                result[upper] = self.call_back_for_upper(x[upper])
+        return float(result) if result.ndim == 0 else result
+
+    def inverse(self, y):
+        """
+        反查：由 y 计算 x（二分查找所在线段），曲线须单调，存在水平线段时取最小的 x。
+        超出散点范围时，若指定了（线性的）回调函数，按回调函数反算，否则返回 nan
+        :param y: float or array_like
+        :return: float or numpy.ndarray 与输入形状一致，无对应 x 的为 nan
+        """
+        if not self.monotone:
+            raise ValueError('关系曲线不是单调的，不能反查：%s' % getattr(self, 'name', self.__class__.__name__))
+        xs, ys = self.xs, self.ys * self.monotone
+        y = np.asarray(y, dtype=float)
+        v = y * self.monotone
+        j = np.minimum(np.searchsorted(ys, v, side='left'), len(ys) - 1)
+        i = np.maximum(j, 1) - 1
+        with np.errstate(divide='ignore', invalid='ignore'):
+            result = np.where(ys[j] == v, xs[j], xs[i] + (v - ys[i]) * (xs[i + 1] - xs[i]) / (ys[i + 1] - ys[i]))
+        for outside, call_back, x0, valid in (
+                (v < ys[0], self.call_back_for_lower, xs[0], np.less),
+                (v > ys[-1], self.call_back_for_upper, xs[-1], np.greater)):
+            if np.any(outside):
+                result = np.where(outside, np.nan, result)
+                if call_back is not None:
+                    a, b = self.__linear_coefficients(call_back, x0)
+                    with np.errstate(divide='ignore', invalid='ignore'):
+                        x = (y[outside] - b) / a
+                    result[outside] = np.where(valid(x, x0), x, np.nan)
+        return float(result) if result.ndim == 0 else result
+
+    @staticmethod
+    def __linear_coefficients(call_back, x0):
+        """由回调函数在 x0 附近的取值计算线性系数 (a, b)，回调函数不是线性函数时抛出 ValueError"""
+        y0, y1, y2 = (float(call_back(x)) for x in (x0, x0 + 1.0, x0 + 2.0))
+        a = y1 - y0
+        if abs((y2 - y1) - a) > 1e-9 * max(1.0, abs(a)):
+            raise ValueError('超出散点范围的回调函数不是线性函数，不能反查')
+        return a, y0 - a * x0
 
     def __call__(self, x):
         return self.linear_my(x)
@@ -58,58 +127,248 @@ class Relationship(RelationshipInterface):
         super().__init__()
 
 
+class LinearCallback(object):
+    """线性回调函数 y = a * x + b，用于曲线超范围部分的计算（可被 pickle，可反查）"""
+    __slots__ = ('a', 'b')
+
+    def __init__(self, a: float, b: float):
+        self.a = a
+        self.b = b
+
+    def __call__(self, x):
+        return self.a * x + self.b
+
+    def __eq__(self, other):
+        return isinstance(other, LinearCallback) and (self.a, self.b) == (other.a, other.b)
+
+    def __hash__(self):
+        return hash((self.a, self.b))
+
+    def __repr__(self):
+        return 'LinearCallback(%r, %r)' % (self.a, self.b)
+
+
+# 关系曲线超出散点范围时的计算函数 {曲线名称: (call_back_for_upper, call_back_for_lower)}，
+# get_curve 总是按此表创建曲线，结果与各曲线首次被哪个调用方获取无关
+call_backs = {
+    'p_pa__r_area1': (LinearCallback(0.941930, -82.817239), None),
+    'p_pa__r_area2': (LinearCallback(0.983130, -73.634872), None),
+    'p_pa__r_area3': (LinearCallback(1.000827, -65.564797), None),
+    'p_pa__r_area4': (LinearCallback(0.966229, -80.241167), None),
+    'p_pa__r_area5': (LinearCallback(0.920911, -87.793045), None),
+    'p_pa__r_area61': (LinearCallback(0.905227, -105.877463), None),
+    'p_pa__r_area62': (LinearCallback(0.886625, -144.415735), None),
+    'p_pa__r_area63': (LinearCallback(0.833674, -169.576178), None),
+    'p_pa__r_areapy1': (LinearCallback(1.004670, -106.832631), None),
+    'p_pa__r_areapy2': (LinearCallback(0.971405, -105.609305), None),
+    'p_pa__r_areapy3': (LinearCallback(0.931111, -104.040891), None),
+    'p_pa__r_areapy4': (LinearCallback(0.898220, -103.795218), None),
+    'p_pa__r_areapy5': (LinearCallback(0.888860, -108.917286), None),
+    'p_pa__r_areapy6': (LinearCallback(0.872092, -114.920066), None),
+    'p_pa__r_areapy7': (LinearCallback(0.830379, -109.919270), None),
+    'p_pa__r_areapy8': (LinearCallback(0.796810, -129.400019), None),
+}
+
+
+class Curve(RelationshipInterface):
+    """轻量的关系曲线对象：使用 __slots__，散点为只读的共享 numpy 数组，可被 pickle（如用于进程池）"""
+    __slots__ = ('name', 'xs', 'ys', 'slopes', 'monotone', 'call_back_for_upper', 'call_back_for_lower')
+
+    def __init__(self, name, points, call_back_for_upper=None, call_back_for_lower=None):
+        """
+        :param name: str 曲线名称
+        :param points: 矢量化的关系曲线散点[(x1, y1), (x2, y2), ...]
+        :param call_back_for_upper: callable f(x)，x 大于散点范围时的计算函数，为 None 时取最大 x 处的值
+        :param call_back_for_lower: callable f(x)，x 小于散点范围时的计算函数，为 None 时取最小 x 处的值
+        """
+        self.name = name
+        self.xs, self.ys, self.slopes, self.monotone = prepare_points(points)
+        self.call_back_for_upper = call_back_for_upper
+        self.call_back_for_lower = call_back_for_lower
+
+    @property
+    def points(self):
+        return np.stack([self.xs, self.ys], axis=-1)
+
+    def __repr__(self):
+        return '<Curve %s (%d points)>' % (self.name, len(self.xs))
+
+
+# 关系曲线注册表 {曲线名称: Curve}，同名曲线只创建一次
+curves = {}
+
+
+def get_curve(name, call_back_for_upper=None, call_back_for_lower=None):
+    """
+    获取关系曲线（首次获取时由 mapping 中的同名数据及 call_backs 中登记的计算函数创建并登记）
+    :param name: str 曲线名称，如 p_pa__r_area1
+    :param call_back_for_upper: callable 见 Curve，可省略；曲线未在 call_backs 中登记时登记为此曲线的计算函数
+    :param call_back_for_lower: callable 见 Curve，同上
+    :return: Curve
+    """
+    upper, lower = call_backs.setdefault(name, (call_back_for_upper, call_back_for_lower))
+    for given, registered in ((call_back_for_upper, upper), (call_back_for_lower, lower)):
+        if given is not None and given != registered:
+            raise ValueError('关系曲线 %s 超出散点范围时的计算函数与已登记的不一致：%r != %r' % (
+                name, given, registered))
+    curve = curves.get(name)
+    if curve is None:
+        curve = curves.setdefault(name, Curve(name, getattr(mapping, name), upper, lower))
+    return curve
+
+
 class MultiTypeRelationshipBase(object):
     """适合分类的关系图基类"""
     @staticmethod
     def get_cls(type_name, points, **kwargs):
+        """
+        创建关系曲线的单例类（每次调用都会创建新的类，新代码请使用 get_curve）。
+        创建的类不登记在单例注册表中，不再使用时随返回的包装函数一同释放
+        """
         return singleton(
             # 包装单例注册器
-            type(type_name, (RelationshipInterface,), dict(points=points, **kwargs))
+            type(type_name, (RelationshipInterface,), dict(points=points, **kwargs)), register=False
         )
 
+    @staticmethod
+    def get_curve(name, call_back_for_upper=None, call_back_for_lower=None):
+        """获取关系曲线，见模块函数 get_curve"""
+        return get_curve(name, call_back_for_upper, call_back_for_lower)
+
+    @staticmethod
+    def evaluate_grouped(instances, codes, xs):
+        """
+        按曲线代码分组批量查关系曲线，每组一次向量化计算
+        :param instances: dict {曲线代码: 关系曲线对象}
+        :param codes: array_like 各点的曲线代码
+        :param xs: array_like 各点的 x，与 codes 形状一致（或可广播）
+        :return: numpy.ndarray 与输入顺序一致的结果
+        """
+        codes, xs = np.broadcast_arrays(np.asarray(codes), np.asarray(xs, dtype=float))
+        result = np.empty(codes.shape, dtype=float)
+        unique, inverse = np.unique(codes.ravel(), return_inverse=True)
+        unknown = [code for code in unique.tolist() if code not in instances]
+        if unknown:
+            raise ValueError('输入区域代码错误！%s' % unknown)
+        inverse = inverse.reshape(codes.shape)
+        for i, code in enumerate(unique.tolist()):
+            mask = inverse == i
+            result[mask] = instances[code](xs[mask])
+        return result
+
+
+class CurveFamily(object):
+    """
+    同一关系图中的一族曲线：各曲线重采样至共用的 x 网格，形成二维表（曲线位置 × x），
+    以双线性插值计算相邻两条曲线之间（小数曲线位置）的值，用于流域下垫面介于两种线型之间时的插补。
+    """
+
+    def __init__(self, instances, codes=None, step=1.0):
+        """
+        :param instances: dict {曲线代码: 关系曲线对象}
+        :param codes: list 按相邻顺序排列的曲线代码，曲线位置 0、1、2…… 依次对应各曲线；默认为 instances 的顺序
+        :param step: float x 网格间距
+        """
+        self.instances = instances
+        self.codes = list(instances.keys() if codes is None else codes)
+        if len(self.codes) < 2:
+            raise ValueError('曲线族至少需要两条曲线')
+        curves = [instances[code] for code in self.codes]
+        self.x0 = min(curve.xs[0] for curve in curves)
+        self.step = float(step)
+        n = int(np.ceil((max(curve.xs[-1] for curve in curves) - self.x0) / self.step)) + 1
+        self.xs = self.x0 + np.arange(max(n, 2)) * self.step
+        self.table = np.array([curve(self.xs) for curve in curves])
+        self.max_error = self.deviation()
+
+    def deviation(self):
+        """
+        重采样引起的最大偏差：在各曲线的全部散点处比较二维表插值与原曲线
+        :return: float 最大偏差（绝对值）
+        """
+        error = 0.0
+        for i, code in enumerate(self.codes):
+            curve = self.instances[code]
+            error = max(error, float(np.max(np.abs(self(i, curve.xs) - curve(curve.xs)))))
+        return error
+
+    def position(self, code):
+        """曲线代码对应的曲线位置"""
+        return self.codes.index(code)
+
+    def __call__(self, position, x):
+        """
+        查曲线族（双线性插值），超出 x 网格范围的点由相邻两条曲线（含其超范围回调函数）直接计算后线性插值
+        :param position: float or array_like 曲线位置，0 ~ len(codes) - 1，如 1.5 为 codes[1] 与 codes[2] 两条曲线的中间
+        :param x: float or array_like
+        :return: float or numpy.ndarray 与输入（广播后）形状一致
+        """
+        position, x = np.broadcast_arrays(np.asarray(position, dtype=float), np.asarray(x, dtype=float))
+        n, m = self.table.shape
+        if not np.all(np.isfinite(position)):
+            raise ValueError('曲线位置必须为有限值')
+        if np.any((position < 0) | (position > n - 1)):
+            raise ValueError('曲线位置超出范围：0 ~ %d' % (n - 1))
+        i = np.minimum(position.astype(np.intp), n - 2)
+        t = position - i
+        fx = (x - self.x0) / self.step
+        inside = (fx >= 0) & (fx <= m - 1)
+        j = np.minimum(np.where(inside, fx, 0).astype(np.intp), m - 2)
+        u = np.where(inside, fx, 0) - j
+        v = self.table
+        result = np.array(v[i, j] * (1 - t) * (1 - u) + v[i + 1, j] * t * (1 - u) +
+                          v[i, j + 1] * (1 - t) * u + v[i + 1, j + 1] * t * u)
+        if not np.all(inside):
+            codes = np.array(self.codes)
+            k = ~inside
+            lower = MultiTypeRelationshipBase.evaluate_grouped(self.instances, codes[i[k]], x[k])
+            upper = MultiTypeRelationshipBase.evaluate_grouped(self.instances, codes[i[k] + 1], x[k])
+            result[k] = lower * (1 - t[k]) + upper * t[k]
+        return float(result) if result.ndim == 0 else result
+
 
 @singleton
 class Relationship84TFAlphaArea1(MultiTypeRelationshipBase):
     """水文分区1的各历时暴雨时面深关系图"""
     def __init__(self):
-        self.r10min = self.get_cls('Relationship84TFAlphaArea1_10min', mapping.t_f_alpha_area1_10min)()
-        self.r1h = self.get_cls('Relationship84TFAlphaArea1_1h', mapping.t_f_alpha_area1_1h)()
-        self.r6h = self.get_cls('Relationship84TFAlphaArea1_6h', mapping.t_f_alpha_area1_6h)()
-        self.r24h = self.get_cls('Relationship84TFAlphaArea1_24h', mapping.t_f_alpha_area1_24h)()
-        self.r3d = self.get_cls('Relationship84TFAlphaArea1_3d', mapping.t_f_alpha_area1_3d)()
+        self.r10min = self.get_curve('t_f_alpha_area1_10min')
+        self.r1h = self.get_curve('t_f_alpha_area1_1h')
+        self.r6h = self.get_curve('t_f_alpha_area1_6h')
+        self.r24h = self.get_curve('t_f_alpha_area1_24h')
+        self.r3d = self.get_curve('t_f_alpha_area1_3d')
 
 
 @singleton
 class RelationshipTFAlphaArea234(MultiTypeRelationshipBase):
     """水文分区2、3、4的各历时暴雨时面深关系图"""
     def __init__(self):
-        self.r10min = self.get_cls('RelationshipTFAlphaArea234_10min', mapping.t_f_alpha_area234_10min)()
-        self.r1h = self.get_cls('RelationshipTFAlphaArea234_1h', mapping.t_f_alpha_area234_1h)()
-        self.r6h = self.get_cls('RelationshipTFAlphaArea234_6h', mapping.t_f_alpha_area234_6h)()
-        self.r24h = self.get_cls('RelationshipTFAlphaArea234_24h', mapping.t_f_alpha_area234_24h)()
-        self.r3d = self.get_cls('RelationshipTFAlphaArea234_3d', mapping.t_f_alpha_area234_3d)()
+        self.r10min = self.get_curve('t_f_alpha_area234_10min')
+        self.r1h = self.get_curve('t_f_alpha_area234_1h')
+        self.r6h = self.get_curve('t_f_alpha_area234_6h')
+        self.r24h = self.get_curve('t_f_alpha_area234_24h')
+        self.r3d = self.get_curve('t_f_alpha_area234_3d')
 
 
 @singleton
 class RelationshipTFAlphaArea56(MultiTypeRelationshipBase):
     """水文分区5、6的各历时暴雨时面深关系图"""
     def __init__(self):
-        self.r10min = self.get_cls('RelationshipTFAlphaArea56_10min', mapping.t_f_alpha_area56_10min)()
-        self.r1h = self.get_cls('RelationshipTFAlphaArea56_1h', mapping.t_f_alpha_area56_1h)()
-        self.r6h = self.get_cls('RelationshipTFAlphaArea56_6h', mapping.t_f_alpha_area56_6h)()
-        self.r24h = self.get_cls('RelationshipTFAlphaArea56_24h', mapping.t_f_alpha_area56_24h)()
-        self.r3d = self.get_cls('RelationshipTFAlphaArea56_3d', mapping.t_f_alpha_area56_3d)()
+        self.r10min = self.get_curve('t_f_alpha_area56_10min')
+        self.r1h = self.get_curve('t_f_alpha_area56_1h')
+        self.r6h = self.get_curve('t_f_alpha_area56_6h')
+        self.r24h = self.get_curve('t_f_alpha_area56_24h')
+        self.r3d = self.get_curve('t_f_alpha_area56_3d')
 
 
 @singleton
 class RelationshipTFAlphaAreaPY(MultiTypeRelationshipBase):
     """水文分区平原区的各历时暴雨时面深关系图（73图集）"""
     def __init__(self):
-        self.r10min = self.get_cls('RelationshipTFAlphaAreaPY_10min', mapping.t_f_alpha_areapy_10min)()
-        self.r1h = self.get_cls('RelationshipTFAlphaAreaPY_1h', mapping.t_f_alpha_areapy_1h)()
-        self.r6h = self.get_cls('RelationshipTFAlphaAreaPY_6h', mapping.t_f_alpha_areapy_6h)()
-        self.r24h = self.get_cls('RelationshipTFAlphaAreaPY_24h', mapping.t_f_alpha_areapy_24h)()
-        self.r3d = self.get_cls('RelationshipTFAlphaAreaPY_3d', mapping.t_f_alpha_areapy_3d)()
+        self.r10min = self.get_curve('t_f_alpha_areapy_10min')
+        self.r1h = self.get_curve('t_f_alpha_areapy_1h')
+        self.r6h = self.get_curve('t_f_alpha_areapy_6h')
+        self.r24h = self.get_curve('t_f_alpha_areapy_24h')
+        self.r3d = self.get_curve('t_f_alpha_areapy_3d')
 
 
 @singleton
@@ -117,14 +376,14 @@ class RelationshipPRHills(MultiTypeRelationshipBase):
     """山丘区降雨径流关系曲线图（84图集）"""
     def __init__(self):
         self.instances = {
-            1: self.get_cls('RelationshipPRHills_1', mapping.p_pa__r_area1, call_back_for_upper=lambda self, x: 0.941930*x-82.817239)(),
-            2: self.get_cls('RelationshipPRHills_2', mapping.p_pa__r_area2, call_back_for_upper=lambda self, x: 0.983130*x-73.634872)(),
-            3: self.get_cls('RelationshipPRHills_3', mapping.p_pa__r_area3, call_back_for_upper=lambda self, x: 1.000827*x-65.564797)(),
-            4: self.get_cls('RelationshipPRHills_4', mapping.p_pa__r_area4, call_back_for_upper=lambda self, x: 0.966229*x-80.241167)(),
-            5: self.get_cls('RelationshipPRHills_5', mapping.p_pa__r_area5, call_back_for_upper=lambda self, x: 0.920911*x-87.793045)(),
-            61: self.get_cls('RelationshipPRHills_61', mapping.p_pa__r_area61, call_back_for_upper=lambda self, x: 0.905227*x-105.877463)(),
-            62: self.get_cls('RelationshipPRHills_62', mapping.p_pa__r_area62, call_back_for_upper=lambda self, x: 0.886625*x-144.415735)(),
-            63: self.get_cls('RelationshipPRHills_63', mapping.p_pa__r_area63, call_back_for_upper=lambda self, x: 0.833674*x-169.576178)(),
+            1: self.get_curve('p_pa__r_area1'),
+            2: self.get_curve('p_pa__r_area2'),
+            3: self.get_curve('p_pa__r_area3'),
+            4: self.get_curve('p_pa__r_area4'),
+            5: self.get_curve('p_pa__r_area5'),
+            61: self.get_curve('p_pa__r_area61'),
+            62: self.get_curve('p_pa__r_area62'),
+            63: self.get_curve('p_pa__r_area63'),
         }
 
         self.areas = self.instances.keys()
@@ -169,10 +428,36 @@ class RelationshipPRHills(MultiTypeRelationshipBase):
         max_ppa = self.max_ppa_in_curve(area)
         return self.__filter_area(self.instances, area)(ppa)
 
+    def R_array(self, areas, ppas):
+        """
+        批量查降雨径流关系曲线（各点可使用不同的曲线）
+        :param areas: array_like 各点的曲线（区域）代码，见 R
+        :param ppas: array_like 各点的 P+Pa（mm），与 areas 一一对应
+        :return: numpy.ndarray 径流深R，与输入顺序一致
+        """
+        return self.evaluate_grouped(self.instances, areas, ppas)
+
+    def family(self, codes=None, step=1.0):
+        """
+        曲线族：用于在相邻线型之间插补
+        :param codes: list 按相邻顺序排列的曲线（区域）代码，默认为全部曲线
+        :param step: float P+Pa 网格间距（mm）
+        :return: CurveFamily 调用方式为 family(曲线位置, P+Pa)
+        """
+        return CurveFamily(self.instances, codes, step)
+
+    def ppa(self, area: int, r):
+        """
+        由径流深R反查 P+Pa（如由实测洪水反推前期影响雨量）
+        :param area: int 曲线（区域）代码，见 R
+        :param r: float or array_like 径流深R（mm）
+        :return: float or numpy.ndarray P+Pa——本次降雨量+前期影响雨量（mm）
+        """
+        return self.__filter_area(self.instances, area).inverse(r)
+
     def max_ppa_in_curve(self, area):
         r_obj = self.__filter_area(self.instances, area)
-        points = r_obj.points
-        return max([p[0] for p in points])
+        return float(r_obj.xs[-1])
 
     def Imax(self, area):
         """
@@ -230,14 +515,14 @@ class RelationshipPRFlat(MultiTypeRelationshipBase):
     """河南省平原地区降雨径流关系曲线图（73图集）"""
     def __init__(self):
         self.instances = {
-            1: self.get_cls('RelationshipPRFlat_1', mapping.p_pa__r_areapy1, call_back_for_upper=lambda self, x: 1.004670*x-106.832631)(),
-            2: self.get_cls('RelationshipPRFlat_2', mapping.p_pa__r_areapy2, call_back_for_upper=lambda self, x: 0.971405*x-105.609305)(),
-            3: self.get_cls('RelationshipPRFlat_3', mapping.p_pa__r_areapy3, call_back_for_upper=lambda self, x: 0.931111*x-104.040891)(),
-            4: self.get_cls('RelationshipPRFlat_4', mapping.p_pa__r_areapy4, call_back_for_upper=lambda self, x: 0.898220*x-103.795218)(),
-            5: self.get_cls('RelationshipPRFlat_5', mapping.p_pa__r_areapy5, call_back_for_upper=lambda self, x: 0.888860*x-108.917286)(),
-            6: self.get_cls('RelationshipPRFlat_6', mapping.p_pa__r_areapy6, call_back_for_upper=lambda self, x: 0.872092*x-114.920066)(),
-            7: self.get_cls('RelationshipPRFlat_7', mapping.p_pa__r_areapy7, call_back_for_upper=lambda self, x: 0.830379*x-109.919270)(),
-            8: self.get_cls('RelationshipPRFlat_8', mapping.p_pa__r_areapy8, call_back_for_upper=lambda self, x: 0.796810*x-129.400019)(),
+            1: self.get_curve('p_pa__r_areapy1'),
+            2: self.get_curve('p_pa__r_areapy2'),
+            3: self.get_curve('p_pa__r_areapy3'),
+            4: self.get_curve('p_pa__r_areapy4'),
+            5: self.get_curve('p_pa__r_areapy5'),
+            6: self.get_curve('p_pa__r_areapy6'),
+            7: self.get_curve('p_pa__r_areapy7'),
+            8: self.get_curve('p_pa__r_areapy8'),
         }
         self.areas = self.instances.keys()
         self._Imax = {1: 100, 2: 100, 3: 100, 4: 100, 5: 100, 6: 100, 7: 100, 8: 100}
@@ -281,10 +566,36 @@ class RelationshipPRFlat(MultiTypeRelationshipBase):
         """
         return self.__filter_area(self.instances, area)(ppa)
 
+    def R_array(self, areas, ppas):
+        """
+        批量查降雨径流关系曲线（各点可使用不同的曲线）
+        :param areas: array_like 各点的曲线（区域）代码，见 R
+        :param ppas: array_like 各点的 P+Pa（mm），与 areas 一一对应
+        :return: numpy.ndarray 径流深R，与输入顺序一致
+        """
+        return self.evaluate_grouped(self.instances, areas, ppas)
+
+    def family(self, codes=None, step=1.0):
+        """
+        曲线族：用于在相邻线型之间插补
+        :param codes: list 按相邻顺序排列的曲线（区域）代码，默认为全部曲线
+        :param step: float P+Pa 网格间距（mm）
+        :return: CurveFamily 调用方式为 family(曲线位置, P+Pa)
+        """
+        return CurveFamily(self.instances, codes, step)
+
+    def ppa(self, area: int, r):
+        """
+        由径流深R反查 P+Pa
+        :param area: int 曲线（区域）代码，见 R
+        :param r: float or array_like 径流深R（mm）
+        :return: float or numpy.ndarray P+Pa——本次降雨量+前期影响雨量（mm）
+        """
+        return self.__filter_area(self.instances, area).inverse(r)
+
     def max_ppa_in_curve(self, area):
         r_obj = self.__filter_area(self.instances, area)
-        points = r_obj.points
-        return max([p[0] for p in points])
+        return float(r_obj.xs[-1])
 
     def Imax(self, area):
         """
@@ -345,12 +656,12 @@ class RelationshipThetaM(MultiTypeRelationshipBase):
     """推理公式汇流参数地区综合θ~m关系图（84图集）"""
     def __init__(self):
         self.chart_instances = {
-            1: self.get_cls('RelationshipThetaM_1', mapping.theta_m_area1)(),
-            2: self.get_cls('RelationshipThetaM_2', mapping.theta_m_area2)(),
-            3: self.get_cls('RelationshipThetaM_3', mapping.theta_m_area3)(),
-            4: self.get_cls('RelationshipThetaM_4', mapping.theta_m_area4)(),
-            5: self.get_cls('RelationshipThetaM_5', mapping.theta_m_area5)(),
-            6: self.get_cls('RelationshipThetaM_6', mapping.theta_m_area5)(),
+            1: self.get_curve('theta_m_area1'),
+            2: self.get_curve('theta_m_area2'),
+            3: self.get_curve('theta_m_area3'),
+            4: self.get_curve('theta_m_area4'),
+            5: self.get_curve('theta_m_area5'),
+            6: self.get_curve('theta_m_area5'),
         }
         self.fit_funcs = {
             1: lambda theta: 0.314287 * theta**0.404842,
@@ -363,8 +674,16 @@ class RelationshipThetaM(MultiTypeRelationshipBase):
         self.areas = self.chart_instances.keys()
 
     @staticmethod
-    def theta(F: float, L: float, J: float):
-        return L / F**0.25 / J**(1.0/3.0)
+    def theta(F, L, J):
+        """
+        汇流参数的流域特征值 θ = L / J^(1/3) / F^(1/4)
+        :param F: float or array_like 流域面积（km2）
+        :param L: float or array_like 干流长度（km）
+        :param J: float or array_like 干流平均坡度（以小数计）
+        :return: float or numpy.ndarray θ
+        """
+        theta = np.asarray(L, dtype=float) / np.asarray(F, dtype=float)**0.25 / np.asarray(J, dtype=float)**(1.0/3.0)
+        return float(theta) if theta.ndim == 0 else theta
 
     def m(self, area: int, theta: float, method: str = 'fit'):
         """
@@ -383,6 +702,29 @@ class RelationshipThetaM(MultiTypeRelationshipBase):
         else:
             return self.fit_funcs.get(area)(theta)
 
+    def m_array(self, areas, thetas, method: str = 'fit'):
+        """
+        批量计算推理公式汇流参数m（各流域可位于不同的水文分区）
+        :param areas: array_like 各流域的84图集水文分区
+        :param thetas: array_like 各流域的θ，与 areas 一一对应
+        :param method: str "fit" 或 "chart"，见 m
+        :return: numpy.ndarray m 汇流参数，与输入顺序一致
+        """
+        funcs = self.chart_instances if method == 'chart' else self.fit_funcs
+        return self.evaluate_grouped(funcs, areas, thetas)
+
+    def m_basins(self, areas, F, L, J, method: str = 'fit'):
+        """
+        由流域特征批量计算推理公式汇流参数m
+        :param areas: array_like 各流域的84图集水文分区
+        :param F: array_like 流域面积（km2）
+        :param L: array_like 干流长度（km）
+        :param J: array_like 干流平均坡度（以小数计）
+        :param method: str "fit" 或 "chart"，见 m
+        :return: numpy.ndarray m 汇流参数
+        """
+        return self.m_array(areas, self.theta(F, L, J), method)
+
 
 @singleton
 class RelationshipAreaMu(object):
@@ -1,22 +1,70 @@
 import os
+import json
+
+try:
+    from . import store
+except ImportError:
+    import store
 
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 curve_data_dir = os.path.join(BASE_DIR, 'data', 'relationship')
 
 
-def gen(file_path):
+def curve_name(file_name):
+    """由 json 文件名得到曲线名称"""
+    return file_name.replace('.json', '').replace('-', '_').replace('+', '_').lower().strip()
+
+
+def read_json_data():
+    """读取矢量化的关系曲线 json 数据，返回 [(曲线名称, 散点), ...]"""
+    data = []
+    for _ in os.listdir(curve_data_dir):
+        if _.endswith('.json'):
+            name = curve_name(_)
+            with open(os.path.join(curve_data_dir, _)) as f:
+                data.append((name, json.load(f)))
+    return data
+
+
+def read_module_data(module):
+    """读取已生成的 mapping.py 模块中的关系曲线数据，返回 [(曲线名称, 散点), ...]"""
+    return [(name, v) for name, v in vars(module).items() if not name.startswith('_') and isinstance(v, list)]
+
+
+def gen(file_path, binary_path=None):
+    """
+    生成关系曲线数据模块 mapping.py
+    :param file_path: str .py 文件路径
+    :param binary_path: str 同时生成二进制关系曲线数据的 .npy 文件路径（供 fun.py 以内存映射方式延迟加载），
+                        曲线名称及偏移量写入同名 .json 文件；为 None 时不生成
+    """
     dm = ''
     for _ in os.listdir(curve_data_dir):
         if _.endswith('.json'):
-            name = _.replace('.json', '').replace('-', '_').replace('+', '_').lower().strip()
+            name = curve_name(_)
             with open(os.path.join(curve_data_dir, _)) as f:
                 v = f.read().strip()
             dm += '%s = %s\n' % (name, v)
     with open(file_path, 'w', encoding='utf-8') as f:
         f.write(dm.replace('\t', '    '))
+    if binary_path is not None:
+        gen_binary(binary_path)
     return dm
 
 
+def gen_binary(file_path, data=None):
+    """
+    生成二进制关系曲线数据
+    :param file_path: str .npy 文件路径
+    :param data: list [(曲线名称, 散点), ...]，默认读取 json 数据。
+                 由 mapping.py 转换时可使用 read_module_data(mapping)
+    """
+    if data is None:
+        data = read_json_data()
+    store.save(file_path, data)
+    return data
+
+
 if __name__ == '__main__':
-    print(gen('mapping.py'))
+    print(gen('mapping.py', 'mapping.npy'))
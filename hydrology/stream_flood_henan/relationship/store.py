@@ -0,0 +1,82 @@
+"""
+关系曲线数据的二进制存储：
+    全部关系曲线的散点按 [x, y] 依次存放在一个 float64 的 .npy 文件中（形状为 (n, 2)），
+    同名 .json 文件记录曲线名称及 CSR 格式的偏移量（第 i 条曲线为 offsets[i]:offsets[i + 1] 行）。
+    加载时使用内存映射，各曲线在首次访问时才读取，导入耗时及内存占用只与实际使用的曲线有关。
+"""
+import os
+import json
+
+import numpy as np
+
+RESOURCE_DIR = os.path.dirname(os.path.abspath(__file__))
+CURVE_BINARY_PATH = os.path.join(RESOURCE_DIR, 'mapping.npy')
+
+
+class CurveDataset(object):
+    """全部关系曲线的散点数据，按曲线名称以属性方式访问（mapping.p_pa__r_area1），与 mapping.py 的接口一致"""
+
+    def __init__(self, data, names, offsets):
+        """
+        :param data: numpy.ndarray shape=(n, 2) 全部曲线的散点数据
+        :param names: list 曲线名称
+        :param offsets: list CSR 偏移量，长度为 len(names) + 1
+        """
+        self.data = data
+        self.names = list(names)
+        self.offsets = list(offsets)
+        self.index = {name: i for i, name in enumerate(self.names)}
+
+    def __getattr__(self, name):
+        # 仅在首次访问某曲线时调用，读取的散点缓存为实例属性
+        index = self.__dict__.get('index', {})
+        if name not in index:
+            raise AttributeError(name)
+        i = index[name]
+        item = np.array(self.data[self.offsets[i]:self.offsets[i + 1]])
+        setattr(self, name, item)
+        return item
+
+    def __repr__(self):
+        return '<CurveDataset (%d curves, %d points)>' % (len(self.names), len(self.data))
+
+
+def index_path(path):
+    return os.path.splitext(path)[0] + '.json'
+
+
+def save(path, data):
+    """
+    保存二进制关系曲线数据
+    :param path: str .npy 文件路径，曲线名称及偏移量写入同名 .json 文件
+    :param data: iterable [(name, points), ...] points 为 [[x1, y1], [x2, y2], ...]
+    """
+    names, blocks, offsets = [], [], [0]
+    for name, points in data:
+        block = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        names.append(name)
+        blocks.append(block)
+        offsets.append(offsets[-1] + len(block))
+    np.save(path, np.concatenate(blocks) if blocks else np.empty((0, 2)))
+    with open(index_path(path), 'w', encoding='utf-8') as f:
+        json.dump(dict(names=names, offsets=offsets), f)
+
+
+def load(path=CURVE_BINARY_PATH, mmap_mode='r'):
+    """
+    加载二进制关系曲线数据
+    :param path: str .npy 文件路径
+    :param mmap_mode: str 内存映射模式，为 None 时读入内存
+    :return: CurveDataset
+    """
+    with open(index_path(path), encoding='utf-8') as f:
+        index = json.load(f)
+    return CurveDataset(np.load(path, mmap_mode=mmap_mode), index['names'], index['offsets'])
+
+
+def load_mapping(path=CURVE_BINARY_PATH):
+    """优先加载二进制关系曲线数据，二进制文件不存在时使用 mapping.py 模块"""
+    if os.path.exists(path) and os.path.exists(index_path(path)):
+        return load(path)
+    from . import mapping
+    return mapping
@@ -2,13 +2,13 @@
 设计暴雨查算
 """
 import math
-from collections import defaultdict
 
 import numpy as np
 from scipy import interpolate, stats, optimize
 
 from .. import contour
 from .. import relationship
+from ..cache import QuantizedLRUCache
 
 
 class PearsonThree(object):
@@ -35,31 +35,66 @@ class PearsonThree(object):
 
 class Stream(object):
     """流域暴雨参数"""
+    param_cache = None  # 查图结果缓存（QuantizedLRUCache），为 None 时不缓存，见 enable_cache
 
-    def __init__(self, lng: float, lat: float):
+    @classmethod
+    def enable_cache(cls, tolerance: float = 1e-5, maxsize: int = 4096):
+        """
+        启用查图结果缓存：坐标按容差取整后相同的流域直接使用缓存的暴雨参数
+        :param tolerance: float 坐标取整容差（度）
+        :param maxsize: int 最大缓存条数，超出时淘汰最久未使用的条目
+        :return: QuantizedLRUCache 可通过其 info() 查看命中、未命中次数
+        """
+        cls.param_cache = QuantizedLRUCache(tolerance, maxsize)
+        return cls.param_cache
+
+    @classmethod
+    def disable_cache(cls):
+        """停用查图结果缓存"""
+        cls.param_cache = None
+
+    def __init__(self, lng: float, lat: float, record=None):
         """
         :param lng: float 流域重心处的经度
         :param lat: float 流域重心处的纬度
+        :param record: numpy.void 暴雨参数记录（contour.StreamParamCube 的查询结果），
+                       指定时直接使用此记录，不再查图
         """
         self.__lng = lng
         self.__lat = lat
-        self.update_param()
+        if record is None:
+            self.update_param()
+        else:
+            self.set_param(record)
+
+    @classmethod
+    def from_record(cls, record):
+        """
+        由暴雨参数记录创建流域暴雨参数对象
+        :param record: numpy.void contour.StreamParamCube 的查询结果（单条记录）
+        :return: Stream
+        """
+        return cls(float(record['lng']), float(record['lat']), record=record)
 
     def update_param(self):
-        """最大10分钟点雨量均值"""
-        self.area = contour.Area84TJ()(self.lng, self.lat)
-        self.h_10min = contour.Contour84T02()(self.lng, self.lat)
-        """最大10分钟点雨量变差系数"""
-        self.cv_10min = contour.Contour84T03()(self.lng, self.lat)
-        self.h_1h = contour.Contour84T05()(self.lng, self.lat)
-        self.cv_1h = contour.Contour84T06()(self.lng, self.lat)
-        self.h_6h = contour.Contour84T08()(self.lng, self.lat)
-        self.cv_6h = contour.Contour84T09()(self.lng, self.lat)
-        self.h_24h = contour.Contour84T11()(self.lng, self.lat)
-        self.cv_24h = contour.Contour84T12()(self.lng, self.lat)
-        self.n1 = contour.Contour84T21()(self.lng, self.lat)
-        self.n2 = contour.Contour84T22()(self.lng, self.lat)
-        self.n3 = contour.Contour84T23()(self.lng, self.lat)
+        """查图获取流域暴雨参数（一次多波段查询）"""
+        lng, lat = self.lng, self.lat
+        if self.param_cache is None:
+            record = contour.StreamParamCube()(lng, lat)
+        else:
+            record = self.param_cache.get_or_compute(lng, lat, lambda: contour.StreamParamCube()(lng, lat))
+        self.set_param(record)
+
+    def set_param(self, record):
+        """
+        由暴雨参数记录设置流域暴雨参数：
+            area 水文分区；h_10min、cv_10min 最大10分钟点雨量均值及变差系数；
+            h_1h、cv_1h、h_6h、cv_6h、h_24h、cv_24h 同理；n1、n2、n3 暴雨递减指数
+        :param record: numpy.void contour.StreamParamCube 的查询结果（单条记录）
+        """
+        for name, _ in contour.STREAM_PARAM_BANDS:
+            setattr(self, name, float(record[name]))
+        self.area = int(record['area'])
         self.r = self.get_alpha_relationship(self.area)
 
     @property
@@ -140,13 +175,15 @@ class DesignStreamInterface(object):
         """
         if self.pr is None:
             raise NotImplementedError('设计暴雨接口必须实现')
+        # 缓存的派生量（模比系数、设计点雨量、暴雨递减指数、设计暴雨时程分配），见 invalidate
+        self.__derived = {}
         self.stream = stream
         self.lng, self.lat = (stream.lng, stream.lat)
         self.__area = stream.area
         self.f = f
         self.__p = self.__check_p(p)
         self.ratio = ratio
-        self.project_type = project_type
+        self.__project_type = project_type
         # 以下4个为计算各历时暴雨参数相应的模比系数函数
         self.get_kp_10min = PearsonThree(self.stream.cv_10min, self.stream.cv_10min * ratio).calc_kp
         self.get_kp_1h = PearsonThree(self.stream.cv_1h, self.stream.cv_1h * ratio).calc_kp
@@ -176,6 +213,7 @@ class DesignStreamInterface(object):
     @p.setter
     def p(self, p):
         self.__p = self.__check_p(p)
+        self.invalidate()
 
     @property
     def area(self):
@@ -185,6 +223,31 @@ class DesignStreamInterface(object):
     def area(self, area):
         self.__area = area
         self.__init_alpha(self.f)
+        self.invalidate()
+
+    @property
+    def project_type(self):
+        return self.__project_type
+
+    @project_type.setter
+    def project_type(self, project_type):
+        self.__project_type = project_type
+        self.invalidate()
+
+    def invalidate(self):
+        """
+        清除缓存的派生量。修改 p、area、project_type、mu 及点面折减系数时自动调用；
+        修改其他参数（如 stream 的暴雨参数）后须手动调用
+        """
+        self.__derived.clear()
+
+    def __memo(self, key, func):
+        """读取缓存的派生量，不存在时调用 func() 计算并缓存"""
+        try:
+            return self.__derived[key]
+        except KeyError:
+            value = self.__derived[key] = func()
+            return value
 
     def __init_alpha(self, f):
         """点面折减系数"""
@@ -200,41 +263,66 @@ class DesignStreamInterface(object):
         """10分钟点面折减系数"""
         return self._alpha_10min
 
+    @alpha_10min.setter
+    def alpha_10min(self, alpha):
+        self._alpha_10min = alpha
+        self.invalidate()
+
     @property
     def alpha_1h(self):
         """1h点面折减系数"""
         return self._alpha_1h
 
+    @alpha_1h.setter
+    def alpha_1h(self, alpha):
+        self._alpha_1h = alpha
+        self.invalidate()
+
     @property
     def alpha_6h(self):
         """6h点面折减系数"""
         return self._alpha_6h
 
+    @alpha_6h.setter
+    def alpha_6h(self, alpha):
+        self._alpha_6h = alpha
+        self.invalidate()
+
     @property
     def alpha_24h(self):
         """24h点面折减系数"""
         return self._alpha_24h
 
+    @alpha_24h.setter
+    def alpha_24h(self, alpha):
+        self._alpha_24h = alpha
+        self.invalidate()
+
     @property
     def alpha_3d(self):
         """3d点面折减系数"""
         return self._alpha_3d
 
+    @alpha_3d.setter
+    def alpha_3d(self, alpha):
+        self._alpha_3d = alpha
+        self.invalidate()
+
     @property
     def kp_10min(self):
-       return self.get_kp_10min(self.p)
+        return self.__memo('kp_10min', lambda: self.get_kp_10min(self.p))
 
     @property
     def kp_1h(self):
-        return self.get_kp_1h(self.p)
+        return self.__memo('kp_1h', lambda: self.get_kp_1h(self.p))
 
     @property
     def kp_6h(self):
-        return self.get_kp_6h(self.p)
+        return self.__memo('kp_6h', lambda: self.get_kp_6h(self.p))
 
     @property
     def kp_24h(self):
-        return self.get_kp_24h(self.p)
+        return self.__memo('kp_24h', lambda: self.get_kp_24h(self.p))
 
     @staticmethod
     def __check_p(p):
@@ -252,74 +340,78 @@ class DesignStreamInterface(object):
         """暴雨递减指数n1"""
         if self.project_type == 2:
             return self.stream.n1
-        return 1 - 1.285 * math.log10(
+        return self.__memo('n1', lambda: 1 - 1.285 * math.log10(
             self.alpha_1h * self.design_h_1h /
             self.alpha_10min / self.design_h_10min
-        )
+        ))
 
     @property
     def n2(self):
         """暴雨递减指数n2"""
         if self.project_type == 2:
             return self.stream.n2
-        return 1 - 1.285 * math.log10(
+        return self.__memo('n2', lambda: 1 - 1.285 * math.log10(
             self.alpha_6h * self.design_h_6h /
             self.alpha_1h / self.design_h_1h
-        )
+        ))
 
     @property
     def n3(self):
         """暴雨递减指数n3"""
         if self.project_type == 2:
             return self.stream.n3
-        return 1 - 1.661 * math.log10(
+        return self.__memo('n3', lambda: 1 - 1.661 * math.log10(
             self.alpha_24h * self.design_h_24h /
             self.alpha_6h / self.design_h_6h
-        )
+        ))
 
     @property
     def design_h_10min(self):
         """设计10分钟点雨量"""
-        return self.get_kp_10min(self.p) * self.stream.h_10min
+        return self.__memo('design_h_10min', lambda: self.kp_10min * self.stream.h_10min)
 
     @property
     def design_h_1h(self):
         """设计1小时点雨量"""
-        return self.get_kp_1h(self.p) * self.stream.h_1h
+        return self.__memo('design_h_1h', lambda: self.kp_1h * self.stream.h_1h)
 
     @property
     def design_h_6h(self):
         """设计6小时点雨量"""
-        return self.get_kp_6h(self.p) * self.stream.h_6h
+        return self.__memo('design_h_6h', lambda: self.kp_6h * self.stream.h_6h)
 
     @property
     def design_h_24h(self):
         """设计24小时点雨量"""
-        return self.get_kp_24h(self.p) * self.stream.h_24h
+        return self.__memo('design_h_24h', lambda: self.kp_24h * self.stream.h_24h)
 
-    def design_ht(self, t: float):
+    def design_ht(self, t):
         """
         其他不同历时的设计点雨量计算
-        :param t: float 历时
-        :return: float
+        :param t: float or array_like 历时
+        :return: float or numpy.ndarray 与输入形状一致
+        """
+        return self.__design_depth(
+            t, self.design_h_10min, self.design_h_1h, self.design_h_6h, self.design_h_24h)
+
+    def __design_depth(self, t, h_10min, h_1h, h_6h, h_24h):
+        """
+        由各标准历时的设计雨量及暴雨递减指数计算任意历时的设计雨量（按历时所在区间选择 n1、n2、n3），
+        历时为10分钟、1、6、24小时时直接取标准历时的设计雨量
         """
         eps = 1e-8
-        if math.fabs(t - 1.0 / 6.0) < eps:
-            return self.design_h_10min
-        elif math.fabs(t - 1) < eps:
-            return self.design_h_1h
-        elif math.fabs(t - 6) < eps:
-            return self.design_h_6h
-        elif math.fabs(t - 24) < eps:
-            return self.design_h_24h
-        elif t < 1:
-            return self.design_h_1h * t**(1 - self.n1)
-        elif 1 < t < 6:
-            return self.design_h_1h * t**(1 - self.n2)
-        elif 6 < t < 24:
-            return self.design_h_24h * 24**(self.n3 - 1) * t**(1 - self.n3)
-        else:
+        t = np.asarray(t, dtype=float)
+        if np.any((t > 24) & (np.abs(t - 24) >= eps)):
             raise ValueError('暴雨历时取值范围应为(0, 24]')
+        with np.errstate(divide='ignore', invalid='ignore'):
+            result = np.select(
+                [t < 1, t < 6],
+                [h_1h * t**(1 - self.n1), h_1h * t**(1 - self.n2)],
+                h_24h * 24**(self.n3 - 1) * t**(1 - self.n3),
+            )
+        for anchor, h in ((1.0 / 6.0, h_10min), (1, h_1h), (6, h_6h), (24, h_24h)):
+            result = np.where(np.abs(t - anchor) < eps, h, result)
+        return float(result) if result.ndim == 0 else result
 
     @property
     def design_hf_10min(self):
@@ -341,29 +433,14 @@ class DesignStreamInterface(object):
         """设计24小时面雨量"""
         return self.design_h_24h * self.alpha_24h
 
-    def design_hft(self, t: float):
+    def design_hft(self, t):
         """
         其他不同历时的设计面雨量计算
-        :param t: float 历时
-        :return: float
+        :param t: float or array_like 历时
+        :return: float or numpy.ndarray 与输入形状一致
         """
-        eps = 1e-8
-        if math.fabs(t - 1.0 / 6.0) < eps:
-            return self.design_hf_10min
-        elif math.fabs(t - 1) < eps:
-            return self.design_hf_1h
-        elif math.fabs(t - 6) < eps:
-            return self.design_hf_6h
-        elif math.fabs(t - 24) < eps:
-            return self.design_hf_24h
-        elif t < 1:
-            return self.design_hf_1h * t**(1 - self.n1)
-        elif 1 < t < 6:
-            return self.design_hf_1h * t**(1 - self.n2)
-        elif 6 < t < 24:
-            return self.design_hf_24h * 24**(self.n3 - 1) * t**(1 - self.n3)
-        else:
-            raise ValueError('暴雨历时取值范围应为(0, 24]')
+        return self.__design_depth(
+            t, self.design_hf_10min, self.design_hf_1h, self.design_hf_6h, self.design_hf_24h)
 
     def __str__(self):
         # s = str(super().__str__())
@@ -406,23 +483,21 @@ class DesignStreamInterface(object):
         设计24小时暴雨时程分配（设计降雨过程）
         :return: list 1~24小时的暴雨时程分配,数据结构为 [(1, r1), (2, r2), ……(24, r24)]
         """
-        hft = defaultdict(float)
-        design_hft = defaultdict(float)
-        for t in range(1, 25):
-            hft[t] = self.design_hft(t)
-
-        for t in range(1, 7):
-            design_hft[t] = (1.0 / 6.0 * (hft[24] - hft[18]))
-
-        for i, t in enumerate(range(7, 15)):
-            design_hft[t] = (hft[23-t-i] - hft[22-t-i])
-
-        for i, t in enumerate(range(16, 24)):
-            design_hft[t] = (hft[t-13+i] - hft[t-14+i])
-
+        return list(self.__memo('design_rain_type_24h', self.__design_rain_type_24h))
+
+    def __design_rain_type_24h(self):
+        # hft[t] 为历时 t 小时的设计面雨量（hft[0] 不使用）
+        hft = np.concatenate([[0.0], self.design_hft(np.arange(1, 25))])
+        i = np.arange(8)
+        design_hft = np.empty(25)
+        design_hft[1:7] = 1.0 / 6.0 * (hft[24] - hft[18])
+        # 第7~14小时：hft[16] - hft[15], hft[14] - hft[13], …… hft[2] - hft[1]
+        design_hft[7:15] = hft[16 - 2 * i] - hft[15 - 2 * i]
         design_hft[15] = hft[1]
-        design_hft[24] = (hft[18] - hft[17])
-        return sorted(list(design_hft.items()), key=lambda x: x[0])
+        # 第16~23小时：hft[3] - hft[2], hft[5] - hft[4], …… hft[17] - hft[16]
+        design_hft[16:24] = hft[3 + 2 * i] - hft[2 + 2 * i]
+        design_hft[24] = hft[18] - hft[17]
+        return list(zip(range(1, 25), design_hft[1:]))
 
     def hourly_net_rain(self, mu: float = None):
         """
@@ -464,6 +539,7 @@ class DesignStreamInterface(object):
     @mu.setter
     def mu(self, mu):
         self.__mu = mu
+        self.invalidate()
 
 
 class DesignStreamHill(DesignStreamInterface):
@@ -4,6 +4,8 @@
 import math
 import random
 
+import numpy as np
+
 
 def is_in_area(point, points):
     """
@@ -58,6 +60,83 @@ def is_in_area(point, points):
         return True
 
 
+class PreparedPolygon(object):
+    """
+    预处理的封闭多边形，用于批量判断点是否位于多边形内部：
+        缓存各边端点坐标数组及外包矩形，并沿 y 方向将平面均匀分带，记录与各带相交的边（分带索引），
+        判断时只需检查点所在带内的边。采用确定性的交叉数（水平射线）法，边界上的点按半开区间规则归属。
+    """
+
+    def __init__(self, points, n_bands=None):
+        """
+        :param points: [(x1, y1), (x2, y2), (x3, y3) ...] -> 多边形拐点坐标列表（首尾不必重复）
+        :param n_bands: int 分带数，默认为边数的平方根
+        """
+        p = np.asarray(points, dtype=float)
+        if len(p) and np.any(p[0] != p[-1]):
+            p = np.vstack([p, p[:1]])
+        self.x1, self.y1 = p[:-1, 0], p[:-1, 1]
+        self.x2, self.y2 = p[1:, 0], p[1:, 1]
+        self.min_bound = p.min(axis=0)
+        self.max_bound = p.max(axis=0)
+
+        n = len(self.x1)
+        self.n_bands = max(1, int(math.sqrt(n))) if n_bands is None else int(n_bands)
+        self.band_height = max((self.max_bound[1] - self.min_bound[1]) / self.n_bands, 1e-12)
+        b0 = self.band(np.minimum(self.y1, self.y2))
+        b1 = self.band(np.maximum(self.y1, self.y2))
+        counts = b1 - b0 + 1
+        edges = np.repeat(np.arange(n), counts)
+        bands = np.repeat(b0, counts) + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        order = np.argsort(bands, kind='stable')
+        self.band_edges = edges[order]
+        self.band_start = np.searchsorted(bands[order], np.arange(self.n_bands + 1))
+
+    def band(self, y):
+        """计算 y 坐标所在的带号"""
+        b = np.floor((np.asarray(y, dtype=float) - self.min_bound[1]) / self.band_height)
+        return np.clip(b, 0, self.n_bands - 1).astype(np.intp)
+
+    def contains(self, x, y, chunk_size=4096):
+        """
+        批量判断点是否位于多边形内部
+        :param x: array_like 点的x坐标
+        :param y: array_like 点的y坐标
+        :param chunk_size: int 每批处理的点数，用于限制内存占用
+        :return: numpy.ndarray bool
+        """
+        x, y = np.broadcast_arrays(np.asarray(x, dtype=float), np.asarray(y, dtype=float))
+        result = np.zeros(x.shape, dtype=bool)
+        px, py = x.ravel(), y.ravel()
+        idx = np.flatnonzero(
+            (px >= self.min_bound[0]) & (px <= self.max_bound[0]) &
+            (py >= self.min_bound[1]) & (py <= self.max_bound[1])
+        )
+        if not len(idx):
+            return result
+        bands = self.band(py[idx])
+        order = np.argsort(bands, kind='stable')
+        idx, bands = idx[order], bands[order]
+        bounds = np.searchsorted(bands, np.arange(self.n_bands + 1))
+        flat = result.ravel()
+        for b in range(self.n_bands):
+            e = self.band_edges[self.band_start[b]:self.band_start[b + 1]]
+            if not len(e) or bounds[b] == bounds[b + 1]:
+                continue
+            x1, y1, x2, y2 = self.x1[e], self.y1[e], self.x2[e], self.y2[e]
+            for i in range(bounds[b], bounds[b + 1], chunk_size):
+                j = idx[i:min(i + chunk_size, bounds[b + 1])]
+                qx, qy = px[j, None], py[j, None]
+                straddle = (y1 > qy) != (y2 > qy)
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    xc = x1 + (qy - y1) * (x2 - x1) / (y2 - y1)
+                flat[j] = np.count_nonzero(straddle & (qx < xc), axis=1) % 2 == 1
+        return result
+
+    def __contains__(self, point):
+        return bool(self.contains(point[0], point[1]))
+
+
 def quadrant8(point1, point2):
     """
     !将坐标系平均分为8个象限（逆时针方向编号为1-8）